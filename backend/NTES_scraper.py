@@ -10,35 +10,121 @@ from webdriver_manager.chrome import ChromeDriverManager
 from datetime import datetime, timedelta
 import time
 import re
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('ntes_scraper.log'),
-        logging.StreamHandler()
-    ]
+from math import sqrt
+import atexit
+import threading
+from functools import lru_cache
+from urllib.parse import urlparse
+from browser_pool import BrowserPool
+from junction_cache import JunctionBoardCache
+from junction_store import open_board_store
+from timetable import Timetable, overlay_live_board, signed_delta
+from junction_poller import JunctionPoller
+from scrape_scheduler import ScrapeScheduler, PRIORITY_SELECTED, PRIORITY_REQUEST, backoff_delay
+from ntes_http import NtesHttpClient, parse_station_board
+from ntes_fixtures import FixtureBoardSource
+import metrics
+from log_pipeline import Deferred, configure_logging
+
+# Configure logging (file and console writes happen on a background thread)
+configure_logging('ntes_scraper.log')
+
+BROWSER_POOL_SIZE = int(os.getenv("RGT_BROWSER_POOL_SIZE", "2"))
+BROWSER_MAX_USES = int(os.getenv("RGT_BROWSER_MAX_USES", "50"))
+SCRAPE_WORKERS = int(os.getenv("RGT_SCRAPE_WORKERS", str(BROWSER_POOL_SIZE)))
+NTES_HOST_CONCURRENCY = int(os.getenv("RGT_NTES_HOST_CONCURRENCY", "3"))
+# Global NTES request budget shared by every scrape, in scrapes per second with bursts of NTES_BURST.
+NTES_RATE = float(os.getenv("RGT_NTES_RATE", "1"))
+NTES_BURST = int(os.getenv("RGT_NTES_BURST", "3"))
+SCRAPE_QUEUE_MAX = int(os.getenv("RGT_SCRAPE_QUEUE_MAX", "32"))
+# A failing junction waits base * 2**failures seconds (jittered, capped) before it is scraped again.
+SCRAPE_BACKOFF_BASE = float(os.getenv("RGT_SCRAPE_BACKOFF_BASE", "5"))
+SCRAPE_BACKOFF_MAX = float(os.getenv("RGT_SCRAPE_BACKOFF_MAX", "300"))
+NTES_BASE_URL = "https://enquiry.indianrail.gov.in/mntes/"
+JUNCTION_TTL = int(os.getenv("RGT_JUNCTION_TTL", "90"))
+JUNCTION_STALE_TTL = int(os.getenv("RGT_JUNCTION_STALE_TTL", "300"))
+POLL_INTERVAL = int(os.getenv("RGT_POLL_INTERVAL", "60"))
+# Shared by worker processes: "sqlite:///path/to/junctions.db" or "redis://host:6379/0"; empty keeps boards per process.
+JUNCTION_STORE = os.getenv("RGT_JUNCTION_STORE", "")
+JUNCTION_LEASE_TTL = int(os.getenv("RGT_JUNCTION_LEASE_TTL", "60"))
+# How long a worker waits on another worker's scrape of a junction before giving up on it.
+JUNCTION_LEASE_WAIT = int(os.getenv("RGT_JUNCTION_LEASE_WAIT", "120"))
+TIMETABLE_PATH = os.getenv(
+    "RGT_TIMETABLE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "kerala_timetable.db")
+)
+# How long a request waits for a live board before answering from the timetable alone.
+LIVE_BOARD_TIMEOUT = float(os.getenv("RGT_LIVE_BOARD_TIMEOUT", "5"))
+# "full": the original windowed browser that loads every resource and navigates per junction.
+# "fast": headless, images/CSS/fonts blocked, eager page loads, stays on the liveStation form between
+# junctions. Opt-in until benchmarks/compare_scrape_profiles.py has been run against live NTES.
+SCRAPE_PROFILE = os.getenv("RGT_SCRAPE_PROFILE", "full")
+SCRAPER_BACKEND = os.getenv("RGT_SCRAPER_BACKEND", "selenium")  # "selenium", "http" or "fixture"
+NTES_FIXTURE_DIR = os.getenv(
+    "RGT_NTES_FIXTURE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks", "fixtures")
 )
 
-def initialize_browser():
+@lru_cache(maxsize=1)
+def get_chromedriver_path():
+    """Resolve chromedriver once per process instead of on every browser launch."""
+    return ChromeDriverManager().install()
+
+# Resources the live station board renders fine without.
+BLOCKED_RESOURCE_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp",
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+]
+
+def browser_options(profile):
+    options = webdriver.ChromeOptions()
+    options.add_argument("--window-size=1200,800")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-webgl")
+    options.add_argument("--log-level=3")
+    if profile == "fast":
+        options.add_argument("--headless=new")
+        # Return from get() at DOMContentLoaded; every step after it waits on the element it needs.
+        options.page_load_strategy = "eager"
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+    return options
+
+@metrics.span("initialize_browser")
+def initialize_browser(profile=SCRAPE_PROFILE):
     try:
-        options = webdriver.ChromeOptions()
-        options.add_argument("--window-size=1200,800")
-        options.add_argument("--disable-gpu")
-        options.add_argument("--no-sandbox")
-        options.add_argument("--disable-dev-shm-usage")
-        options.add_argument("--disable-webgl")
-        options.add_argument("--log-level=3")
-        logging.info("Initializing Chrome browser...")
-        service = Service(ChromeDriverManager().install())
-        driver = webdriver.Chrome(service=service, options=options)
+        logging.info(f"Initializing Chrome browser ({profile} profile)...")
+        service = Service(get_chromedriver_path())
+        driver = webdriver.Chrome(service=service, options=browser_options(profile))
+        if profile == "fast":
+            # The images pref doesn't cover stylesheets or fonts; block those at the network layer.
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_RESOURCE_PATTERNS})
         logging.info("Chrome browser initialized successfully.")
         return driver
     except Exception as e:
         logging.error(f"Failed to initialize Chrome browser: {e}")
         return None
 
+browser_pool = BrowserPool(initialize_browser, size=BROWSER_POOL_SIZE, max_uses=BROWSER_MAX_USES)
+atexit.register(browser_pool.close)
+
+scrape_scheduler = ScrapeScheduler(
+    workers=SCRAPE_WORKERS, rate=NTES_RATE, burst=NTES_BURST, max_queue=SCRAPE_QUEUE_MAX,
+    backoff_base=SCRAPE_BACKOFF_BASE, backoff_max=SCRAPE_BACKOFF_MAX
+)
+atexit.register(scrape_scheduler.stop)
+
+_host_limits = {}
+_host_limits_lock = threading.Lock()
+
+def host_limit(url):
+    """Per-host semaphore so parallel scrapes never open more than NTES_HOST_CONCURRENCY pages on one site."""
+    host = urlparse(url).netloc
+    with _host_limits_lock:
+        if host not in _host_limits:
+            _host_limits[host] = threading.BoundedSemaphore(NTES_HOST_CONCURRENCY)
+        return _host_limits[host]
+
 def wait_for_element(driver, by, value, description, timeout=10, retries=2):
     attempt = 0
     while attempt < retries:
@@ -51,9 +137,10 @@ def wait_for_element(driver, by, value, description, timeout=10, retries=2):
             return element
         except Exception as e:
             logging.warning(f"Failed to find {description}: {e}")
+            metrics.WAIT_RETRIES.labels(description).inc()
             attempt += 1
             if attempt < retries:
-                time.sleep(2)
+                time.sleep(backoff_delay(attempt - 1, base=0.5, cap=4))
     logging.error(f"{description} not found after {retries} attempts")
     return None
 
@@ -116,27 +203,124 @@ def is_within_two_hours(time_str, current_time):
         logging.error(f"Error checking if time is within two hours: {e}")
         return False
 
-async def get_live_trains(driver, station_name):
+def build_train_records(rows, station_name):
+    """Turn (train_text, arrival_text, departure_text) rows of a station board into train dicts."""
+    trains = []
+    current_time = datetime.now().time()
+    last_updated = datetime.now().isoformat() + "Z"
+
+    for train_text, arrival_text, departure_text in rows:
+        try:
+            train_no, route = extract_train_identifier(train_text)
+            if not train_no or not route:
+                continue
+
+            name_match = re.search(r'\|\s*(.*?)\s*\(', train_text)
+            train_name = name_match.group(1).strip() if name_match else ""
+
+            route_parts = route.split("-")
+            origin = route_parts[0] if route_parts else ""
+            destination = route_parts[1] if len(route_parts) > 1 else ""
+
+            arrival_time_str = extract_time(arrival_text.strip()) or "Unknown"
+            departure_time_str = extract_time(departure_text.strip()) or "Unknown"
+
+            if departure_time_str.lower() in ["source", "destination"] or not is_within_two_hours(departure_time_str, current_time):
+                continue
+
+            train_data = {
+                "trainNumber": train_no,
+                "trainName": train_name,
+                "route": {"origin": origin, "destination": destination, "fullRoute": route},
+                "schedule": {"arrival": arrival_time_str, "departure": departure_time_str},
+                "metadata": {"queriedStation": station_name, "lastUpdated": last_updated},
+                "direction": {"from": "", "to": ""}
+            }
+            trains.append(train_data)
+        except Exception as e:
+            logging.error(f"Error processing row for {station_name}: {e}")
+
+    logging.info("Found %d trains within 2 hours at %s", len(trains), station_name)
+    for train in trains:
+        logging.info("Train at %s: %s (%s), Arrival: %s, Departure: %s", station_name, train['trainNumber'],
+                     train['trainName'], train['schedule']['arrival'], train['schedule']['departure'])
+    return trains
+
+# Same rows as `.//tbody/tr[position()>1]` with at least five cells, read in a single WebDriver call.
+BOARD_ROWS_SCRIPT = """
+var out = [];
+arguments[0].querySelectorAll('tbody').forEach(function (tbody) {
+    var rows = tbody.querySelectorAll(':scope > tr');
+    for (var i = 1; i < rows.length; i++) {
+        var cells = rows[i].querySelectorAll(':scope > td');
+        if (cells.length >= 5) {
+            out.push([cells[1].innerText, cells[2].innerText, cells[3].innerText]);
+        }
+    }
+});
+return out;
+"""
+
+def normalize_cell_text(text):
+    """Collapse whitespace within each line and drop blank lines, like Selenium's `.text`."""
+    lines = (" ".join(line.split()) for line in (text or "").split("\n"))
+    return "\n".join(line for line in lines if line)
+
+@metrics.span("board_extraction")
+def extract_board_rows(driver, table, station_name):
+    """(train_text, arrival_text, departure_text) for every results row, without a round trip per cell.
+
+    Falls back to parsing `page_source` when the script can't run (e.g. the table went stale).
+    """
     try:
-        if "mntes" not in driver.current_url:
-            logging.info(f"Navigating to NTES main page for {station_name}")
-            driver.get("https://enquiry.indianrail.gov.in/mntes/")
-            wait_for_element(driver, By.XPATH, "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'live station')]", "Live Station button")
-
-        logging.info(f"Clicking 'Live Station' link for {station_name}")
-        live_station_btn = wait_for_element(
-            driver,
-            By.XPATH,
-            "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'live station')]",
-            "Live Station button"
-        )
-        if live_station_btn:
-            live_station_btn.click()
-            time.sleep(2)
+        rows = driver.execute_script(BOARD_ROWS_SCRIPT, table)
+        return [tuple(normalize_cell_text(cell) for cell in row) for row in rows]
+    except Exception as e:
+        logging.warning(f"Scripted board extraction failed for {station_name}, parsing page source: {e}")
+    rows = parse_station_board(driver.page_source)
+    if rows is None:
+        raise Exception("Results table not found in page source")
+    return rows
+
+def on_live_station_form(driver):
+    """Whether the driver is already showing the liveStation form, so the next junction can skip navigation."""
+    try:
+        return "mntes" in driver.current_url and bool(driver.find_elements(By.ID, "jFromStationInput"))
+    except Exception:
+        return False
+
+def open_live_station_form(driver, station_name):
+    """Navigate to the liveStation form the way a user would: main page, then the Live Station link."""
+    if "mntes" not in driver.current_url:
+        logging.info(f"Navigating to NTES main page for {station_name}")
+        driver.get(NTES_BASE_URL)
+        wait_for_element(driver, By.XPATH, "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'live station')]", "Live Station button")
+
+    logging.info(f"Clicking 'Live Station' link for {station_name}")
+    live_station_btn = wait_for_element(
+        driver,
+        By.XPATH,
+        "//a[contains(translate(text(), 'ABCDEFGHIJKLMNOPQRSTUVWXYZ', 'abcdefghijklmnopqrstuvwxyz'), 'live station')]",
+        "Live Station button"
+    )
+    if live_station_btn:
+        live_station_btn.click()
+    else:
+        logging.info(f"Falling back to direct URL for {station_name}")
+        driver.get(NTES_BASE_URL + "liveStation")
+
+def get_live_trains(driver, station_name, reuse_form=None):
+    if reuse_form is None:
+        reuse_form = SCRAPE_PROFILE == "fast"
+    try:
+        if reuse_form and on_live_station_form(driver):
+            logging.info(f"Reusing the liveStation form for {station_name}")
+            # Drop the previous junction's results so the wait below can only match this board.
+            driver.execute_script(
+                "document.querySelectorAll('table.w3-table').forEach(function (t) { t.remove(); });"
+            )
         else:
-            logging.info(f"Falling back to direct URL for {station_name}")
-            driver.get("https://enquiry.indianrail.gov.in/mntes/liveStation")
-            time.sleep(2)
+            open_live_station_form(driver, station_name)
 
         station_input = wait_for_element(driver, By.ID, "jFromStationInput", "Station input")
         if not station_input:
@@ -164,7 +348,6 @@ async def get_live_trains(driver, station_name):
         if not table:
             logging.info(f"Refreshing page and retrying for {station_name}")
             driver.refresh()
-            time.sleep(2)
             submit_btn = wait_for_element(driver, By.XPATH, "//input[@value='Get Trains']", "Submit button")
             if submit_btn:
                 submit_btn.click()
@@ -172,212 +355,372 @@ async def get_live_trains(driver, station_name):
             if not table:
                 raise Exception("Results table not found after retry")
 
-        trains = []
-        rows = table.find_elements(By.XPATH, ".//tbody/tr[position()>1]")
-        logging.info(f"Found {len(rows)} trains at {station_name}")
+        row_texts = extract_board_rows(driver, table, station_name)
+        logging.info(f"Found {len(row_texts)} trains at {station_name}")
+        return build_train_records(row_texts, station_name)
 
-        current_time = datetime.now().time()
-        last_updated = datetime.now().isoformat() + "Z"
+    except Exception as e:
+        logging.error(f"Error scraping {station_name}: {e}")
+        metrics.SCRAPE_FAILURES.labels(station_name, "selenium").inc()
+        # None, not []: an empty board means a quiet junction, a failed scrape must count towards backoff.
+        return None
 
-        for row in rows:
+def track_fraction(chainage):
+    """Where the gate sits between J1 (0.0) and J2 (1.0) along the track, from precomputed chainage."""
+    if not chainage:
+        return None
+    span = chainage["J2"] - chainage["J1"]
+    if span == 0:
+        return 0.0
+    return min(1.0, max(0.0, (chainage["gate"] - chainage["J1"]) / span))
+
+def straight_line_fraction(j1_lat, j1_lon, j2_lat, j2_lon, gate_lat, gate_lon):
+    """Gate position between J1 and J2 from straight-line distances; used when no chainage is known."""
+    j1_to_j2_dist = sqrt((j2_lat - j1_lat) ** 2 + (j2_lon - j1_lon) ** 2)
+    j1_to_gate_dist = sqrt((gate_lat - j1_lat) ** 2 + (gate_lon - j1_lon) ** 2)
+    return j1_to_gate_dist / j1_to_j2_dist if j1_to_j2_dist > 0 else 0
+
+def time_to_minutes(time_str):
+    """'HH:MM' -> minutes since midnight, or None."""
+    time_clean = extract_time(time_str) if time_str else None
+    if not time_clean:
+        return None
+    hours, minutes = time_clean.split(":")
+    return int(hours) * 60 + int(minutes)
+
+def format_minutes(minutes):
+    minutes = int(minutes) % 1440
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+@metrics.span("train_join")
+def join_junction_pair(j1_code, j2_code, j1_trains, j2_trains):
+    """Match trains seen at both junctions once per (J1, J2) pair.
+
+    Returns (train, j1_minutes, j2_minutes) tuples. Each train is a new dict built
+    from the board entries, so the boards themselves are never modified.
+    """
+    j2_by_number = {}
+    for j2_train in j2_trains:
+        j2_by_number.setdefault(j2_train["trainNumber"], j2_train)
+
+    matches = []
+    for j1_train in j1_trains:
+        j2_train = j2_by_number.get(j1_train["trainNumber"])
+        if not j2_train:
+            continue
+        j1_departure = extract_time(j1_train["schedule"]["departure"])
+        j2_departure = extract_time(j2_train["schedule"]["departure"])
+        if not (j1_departure and j2_departure):
+            continue
+        j1_minutes = time_to_minutes(j1_departure)
+        j2_minutes = time_to_minutes(j2_departure)
+        # J2 after J1 on the 24h clock (within 12h either way), so a run across midnight keeps its direction.
+        forward = signed_delta(j2_minutes, j1_minutes) > 0
+        base = j1_train if forward else j2_train
+        train = {
+            **base,
+            "direction": {"from": j1_code if forward else j2_code, "to": j2_code if forward else j1_code},
+            "schedule": {
+                **base["schedule"],
+                "arrival_at_J1": j1_train["schedule"]["arrival"],
+                "departure_at_J1": j1_departure,
+                "arrival_at_J2": j2_train["schedule"]["arrival"],
+                "departure_at_J2": j2_departure
+            }
+        }
+        matches.append((train, j1_minutes, j2_minutes))
+    return matches
+
+@metrics.span("gate_passage")
+def trains_passing_gate(pair_matches, fraction, now_minutes):
+    """Trains from a junction-pair join that pass the gate within 2 hours, soonest first."""
+    passing = []
+    for train, j1_minutes, j2_minutes in pair_matches:
+        # Signed minutes from now to each junction departure: a train that left J1 a few minutes ago
+        # is still on its way to the gate.
+        j1_rel = signed_delta(j1_minutes, now_minutes)
+        j2_rel = signed_delta(j2_minutes, now_minutes)
+        passage_rel = j1_rel + (j2_rel - j1_rel) * fraction
+        if 0 <= passage_rel <= 120:
+            passing.append((int(passage_rel), train))
+    passing.sort(key=lambda item: item[0])
+    return [
+        {**train, "schedule": {**train["schedule"], "gate_passage": format_minutes(now_minutes + passage_rel)}}
+        for passage_rel, train in passing
+    ]
+
+http_client = NtesHttpClient(NTES_BASE_URL, pool_size=NTES_HOST_CONCURRENCY)
+fixture_source = FixtureBoardSource(NTES_FIXTURE_DIR)
+atexit.register(http_client.close)
+
+def scrape_junction(junction_code):
+    """Scrape one junction board. Returns None if neither backend could reach NTES."""
+    if SCRAPER_BACKEND == "fixture":
+        # Offline replay of recorded boards (benchmarks); never touches NTES.
+        with metrics.scrape_span(junction_code, "fixture"):
+            return build_train_records(fixture_source.get_board_rows(junction_code), junction_code)
+    with host_limit(NTES_BASE_URL):
+        if SCRAPER_BACKEND == "http":
             try:
-                cols = row.find_elements(By.TAG_NAME, "td")
-                if len(cols) >= 5:
-                    train_text = cols[1].text
-                    train_no, route = extract_train_identifier(train_text)
-                    if not train_no or not route:
-                        continue
-
-                    name_match = re.search(r'\|\s*(.*?)\s*\(', train_text)
-                    train_name = name_match.group(1).strip() if name_match else ""
-
-                    route_parts = route.split("-")
-                    origin = route_parts[0] if route_parts else ""
-                    destination = route_parts[1] if len(route_parts) > 1 else ""
-
-                    arrival_time_str = extract_time(cols[2].text.strip()) or "Unknown"
-                    departure_time_str = extract_time(cols[3].text.strip()) or "Unknown"
-
-                    if departure_time_str.lower() in ["source", "destination"] or not is_within_two_hours(departure_time_str, current_time):
-                        continue
-
-                    train_data = {
-                        "trainNumber": train_no,
-                        "trainName": train_name,
-                        "route": {"origin": origin, "destination": destination, "fullRoute": route},
-                        "schedule": {"arrival": arrival_time_str, "departure": departure_time_str},
-                        "metadata": {"queriedStation": station_name, "lastUpdated": last_updated},
-                        "direction": {"from": "", "to": ""}
-                    }
-                    trains.append(train_data)
+                with metrics.scrape_span(junction_code, "http"):
+                    return build_train_records(http_client.get_board_rows(junction_code), junction_code)
             except Exception as e:
-                logging.error(f"Error processing row for {station_name}: {e}")
+                logging.warning(f"HTTP scrape failed for {junction_code}, falling back to Selenium: {e}")
+        with browser_pool.session() as driver:
+            if not driver:
+                metrics.SCRAPE_FAILURES.labels(junction_code, "selenium").inc()
+                return None
+            logging.info(f"Fetching train data for junction: {junction_code}")
+            with metrics.scrape_span(junction_code, "selenium"):
+                return get_live_trains(driver, junction_code)
 
-        logging.info(f"Found {len(trains)} trains within 2 hours at {station_name}")
-        for train in trains:
-            logging.info(f"Train at {station_name}: {train['trainNumber']} ({train['trainName']}), Arrival: {train['schedule']['arrival']}, Departure: {train['schedule']['departure']}")
-        return trains
+timetable = Timetable(TIMETABLE_PATH)
 
-    except Exception as e:
-        logging.error(f"Error scraping {station_name}: {e}")
-        return []
+def load_junction_board(junction_code):
+    """Scrape a junction and teach the timetable any trains it hasn't seen there."""
+    trains = scrape_junction(junction_code)
+    if trains:
+        try:
+            timetable.learn_board(junction_code, trains)
+        except Exception as e:
+            logging.error(f"Failed to record {junction_code} board in the timetable: {e}")
+    return trains
 
-def approximate_gate_passage_time(j1_time, j2_time, j1_lat, j1_lon, j2_lat, j2_lon, gate_lat, gate_lon):
-    """Approximate when a train passes the gate based on J1 and J2 times and distances."""
-    try:
-        from math import sqrt
-        now = datetime.now()
-        j1_dt = datetime.combine(now.date(), datetime.strptime(j1_time, "%H:%M").time())
-        j2_dt = datetime.combine(now.date(), datetime.strptime(j2_time, "%H:%M").time())
+junction_cache = JunctionBoardCache(
+    scrape_scheduler.guard(load_junction_board), ttl=JUNCTION_TTL, stale_ttl=JUNCTION_STALE_TTL,
+    scheduler=scrape_scheduler, store=open_board_store(JUNCTION_STORE), lease_ttl=JUNCTION_LEASE_TTL, lease_wait=JUNCTION_LEASE_WAIT
+)
+
+junction_poller = JunctionPoller(junction_cache, scrape_scheduler, interval=POLL_INTERVAL)
+atexit.register(junction_poller.stop)
+
+async def get_junction_board(junction_code, priority=PRIORITY_REQUEST):
+    """Awaitable junction board: served inline from the snapshot/cache, queued on the scrape scheduler otherwise."""
+    if junction_cache.store is None:
+        trains = junction_poller.board_nowait(junction_code)
+    else:
+        # Checking the shared store is SQLite or Redis I/O; keep it off the event loop.
+        trains = await asyncio.get_running_loop().run_in_executor(None, junction_poller.board_nowait, junction_code)
+    if trains is not None:
+        return trains
+    # Shielded: the job is shared with every other request waiting on this junction.
+    return await asyncio.shield(asyncio.wrap_future(
+        scrape_scheduler.submit(junction_code, junction_poller.board, priority, junction_code)
+    ))
+
+def gate_junction_codes(gate):
+    """(J1 code, J2 code) for a prepared gate; empty strings when the gate has no controlling junctions."""
+    junctions = gate.get("junctions") or {}
+    j1 = junctions.get("before") or {}
+    j2 = junctions.get("after") or {}
+    return j1.get("code", j1.get("name", "")), j2.get("code", j2.get("name", ""))
+
+def prioritize_selected_gate(gates, selected_gate_id):
+    """Move the user-selected gate to the front of `gates` in place."""
+    if selected_gate_id:
+        logging.info(f"Prioritizing the Selected gate: {selected_gate_id}")
+        #Find the gate's all informatino and add it to be first item
+        selected_gate_info = next((gate for gate in gates if gate['gate_id'] == selected_gate_id), None)
+
+        if selected_gate_info:
+            gates.remove(selected_gate_info) # remove from the current location
+            gates.insert(0,selected_gate_info) # Insert at 0.
+
+class GateReport(Deferred):
+    """The multi-line per-gate log block, built only when the log thread emits it."""
+
+    def __init__(self, gate_id, nearest, before, after, j1, j2, live_trains, gate_status):
+        self.gate_id = gate_id
+        self.nearest = nearest
+        self.before = before
+        self.after = after
+        self.j1 = j1
+        self.j2 = j2
+        self.live_trains = live_trains
+        self.gate_status = gate_status
+
+    def render(self):
+        log_output = f"\nGATE: {self.gate_id}\n"
+        log_output += f"NEAREST STATION: {self.nearest[0]} ({self.nearest[1]})\n"
+        log_output += f"ADJACENT STATIONS: {self.before[0]} ({self.before[1]}) - {self.after[0]} ({self.after[1]})\n"
+        log_output += f"JUNCTION STATIONS: {self.j1[0]} ({self.j1[1]}) - {self.j2[0]} ({self.j2[1]})\n"
+        log_output += "TRAINS PASSING WITH TIME:\n"
+        if self.live_trains:
+            for train in self.live_trains:
+                log_output += f"- {train['trainNumber']} ({train['trainName']}): J1 {train['schedule']['arrival_at_J1']}/{train['schedule']['departure_at_J1']} -> J2 {train['schedule']['arrival_at_J2']}/{train['schedule']['departure_at_J2']}, Gate Passage: {train['schedule']['gate_passage']}\n"
+        else:
+            log_output += "- None\n"
+        log_output += f"GATE STATUS: {self.gate_status}"
+        return log_output
+
+def gate_track_position(gate):
+    """(J1 code, J2 code, fraction of the way from J1 to J2) for a prepared gate, or None if data is missing."""
+    junctions = gate.get("junctions") or {}
+    j1 = junctions.get("before") or {}
+    j2 = junctions.get("after") or {}
+    j1_code, j2_code = gate_junction_codes(gate)
+    gate_lat = gate.get("position", {}).get("latitude")
+    gate_lon = gate.get("position", {}).get("longitude")
+    j1_lat = j1.get("position", {}).get("latitude")
+    j1_lon = j1.get("position", {}).get("longitude")
+    j2_lat = j2.get("position", {}).get("latitude")
+    j2_lon = j2.get("position", {}).get("longitude")
+    if not (j1_code and j2_code and gate_lat and gate_lon and j1_lat and j1_lon and j2_lat and j2_lon):
+        return None
+    # Linear-referenced position along the track, projected once by the backend.
+    fraction = track_fraction(gate.get("chainage"))
+    if fraction is None:
+        fraction = straight_line_fraction(j1_lat, j1_lon, j2_lat, j2_lon, gate_lat, gate_lon)
+    return j1_code, j2_code, fraction
+
+def predict_gate_passages(track_position, all_junction_trains, pair_joins, now_minutes):
+    """Trains passing the gate within 2 hours, or None if either junction board is missing."""
+    j1_code, j2_code, fraction = track_position
+    j1_trains = all_junction_trains.get(j1_code)
+    j2_trains = all_junction_trains.get(j2_code)
+    if j1_trains is None or j2_trains is None:
+        return None
+    # Every gate between the same junctions shares one join.
+    if (j1_code, j2_code) not in pair_joins:
+        pair_joins[(j1_code, j2_code)] = join_junction_pair(j1_code, j2_code, j1_trains, j2_trains)
+    return trains_passing_gate(pair_joins[(j1_code, j2_code)], fraction, now_minutes)
+
+def resolve_gate(gate, all_junction_trains, pair_joins, now_minutes):
+    """Live trains and open/closed status for one gate from the junction boards fetched so far."""
+    junctions = gate.get("junctions") or {}
+    j1_name = (junctions.get("before") or {}).get("name", "")
+    j2_name = (junctions.get("after") or {}).get("name", "")
+    nearest = gate.get("nearest_station") or {}
+    adjacent = gate.get("adjacent_stations") or {}
+    nearest_name = nearest.get("name", "")
+    nearest_code = nearest.get("code", "")
+    before_name = (adjacent.get("before") or {}).get("name", "")
+    before_code = (adjacent.get("before") or {}).get("code", "")
+    after_name = (adjacent.get("after") or {}).get("name", "")
+    after_code = (adjacent.get("after") or {}).get("code", "")
+
+    track_position = gate_track_position(gate)
+    if track_position is None:
+        logging.warning(f"Skipping gate {gate.get('gate_id')} due to missing data")
+        return {"gate_id": gate.get("gate_id"), "live_trains": [], "gate_status": "Unknown"}
+    j1_code, j2_code, _ = track_position
+
+    #3. Join the pre-fetched junction boards:
+    live_trains = predict_gate_passages(track_position, all_junction_trains, pair_joins, now_minutes)
+    if live_trains is None:
+        logging.warning(f"No browser was available to scrape junctions for gate {gate.get('gate_id')}")
+        return {"gate_id": gate.get("gate_id"), "live_trains": [], "gate_status": "Unknown"}
+    gate_status = "Closed" if live_trains else "Open"
+
+    logging.info("%s", GateReport(gate.get('gate_id'), (nearest_name, nearest_code), (before_name, before_code),
+                                  (after_name, after_code), (j1_name, j1_code), (j2_name, j2_code),
+                                  live_trains, gate_status))
+
+    ages = [age for age in (junction_cache.age(j1_code), junction_cache.age(j2_code)) if age is not None]
+    return {
+        "gate_id": gate.get("gate_id"),
+        "live_trains": live_trains,
+        "gate_status": gate_status,
+        "data_age_seconds": round(max(ages), 1) if ages else None
+    }
+
+def board_with_timetable(junction_code, live, now_minutes):
+    """Board gates are predicted from: timetable baseline with `live` overlaid, or just `live` if the timetable has no stops there."""
+    if not timetable.knows(junction_code):
+        return live
+    return overlay_live_board(timetable.board(junction_code, now_minutes), live)
+
+async def _fetch_board(junction_code, priority=PRIORITY_REQUEST):
+    """Board for one junction: the timetable baseline with live delays overlaid when the scrape is ready in time."""
+    if not timetable.knows(junction_code):
+        try:
+            return junction_code, await get_junction_board(junction_code, priority)
+        except Exception as e:
+            logging.error(f"Scrape failed for junction {junction_code}: {e}")
+            return junction_code, None
 
-        if j1_dt < now:
-            j1_dt += timedelta(days=1)
-        if j2_dt < now:
-            j2_dt += timedelta(days=1)
+    now = datetime.now()
+    try:
+        # Shielded so a timed-out scrape keeps running and fills the cache for the next request.
+        live = await asyncio.wait_for(asyncio.shield(get_junction_board(junction_code, priority)), LIVE_BOARD_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.warning(f"Live board for {junction_code} not ready after {LIVE_BOARD_TIMEOUT}s, using the timetable")
+        live = None
+    except Exception as e:
+        logging.error(f"Scrape failed for junction {junction_code}, using the timetable: {e}")
+        live = None
+    return junction_code, board_with_timetable(junction_code, live, now.hour * 60 + now.minute)
 
-        j1_to_j2_dist = sqrt((j2_lat - j1_lat) ** 2 + (j2_lon - j1_lon) ** 2)
-        j1_to_gate_dist = sqrt((gate_lat - j1_lat) ** 2 + (gate_lon - j1_lon) ** 2)
-        fraction = j1_to_gate_dist / j1_to_j2_dist if j1_to_j2_dist > 0 else 0
+async def stream_live_train_data(station_data):
+    """Yield (gate, result) pairs as soon as each gate's two junction boards are available.
 
-        time_diff = (j2_dt - j1_dt).total_seconds() / 60
-        gate_pass_minutes = time_diff * fraction
+    The selected gate's junctions are awaited first so it is always emitted first.
+    """
+    selected_gate_id = station_data.get("selected_gate_id")
+    gates = list(station_data.get("gates", []))
+    prioritize_selected_gate(gates, selected_gate_id)
+
+    #1. Collect all unique Junction codes:
+    unique_junction_codes = set()
+    for gate in gates:
+        unique_junction_codes.update(code for code in gate_junction_codes(gate) if code)
+    logging.info(f"Unique Junction codes {unique_junction_codes}")
+
+    #2. Fetch live train data for all unique junction codes concurrently, the selected gate's junctions first:
+    selected_codes = set()
+    if gates and selected_gate_id and gates[0].get("gate_id") == selected_gate_id:
+        selected_codes = {code for code in gate_junction_codes(gates[0]) if code}
+    tasks = {}
+    for code in sorted(unique_junction_codes, key=lambda code: code not in selected_codes):
+        priority = PRIORITY_SELECTED if code in selected_codes else PRIORITY_REQUEST
+        tasks[code] = asyncio.ensure_future(_fetch_board(code, priority))
+    all_junction_trains = {}
+    pair_joins = {}
+    now = datetime.now()
+    now_minutes = now.hour * 60 + now.minute
+    pending = list(gates)
+
+    def ready(gate):
+        return all(code in all_junction_trains for code in gate_junction_codes(gate) if code)
 
-        gate_pass_dt = j1_dt + timedelta(minutes=gate_pass_minutes)
-        return gate_pass_dt.strftime("%H:%M")
-    except Exception as e:
-        logging.error(f"Error approximating gate passage time: {e}")
-        return None
+    try:
+        if pending and selected_gate_id and pending[0].get("gate_id") == selected_gate_id:
+            selected = pending.pop(0)
+            for code in gate_junction_codes(selected):
+                if code:
+                    all_junction_trains[code] = (await tasks[code])[1]
+            yield selected, resolve_gate(selected, all_junction_trains, pair_joins, now_minutes)
+
+        remaining = [task for code, task in tasks.items() if code not in all_junction_trains]
+        while True:
+            emit = [gate for gate in pending if ready(gate)]
+            for gate in emit:
+                pending.remove(gate)
+                yield gate, resolve_gate(gate, all_junction_trains, pair_joins, now_minutes)
+            if not pending or not remaining:
+                break
+            done, _ = await asyncio.wait(remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                remaining.remove(task)
+                code, board = task.result()
+                all_junction_trains[code] = board
+    finally:
+        for task in tasks.values():
+            task.cancel()
 
 async def fetch_live_train_data(station_data): # Remove default mode, add selected_gate_id
     logging.info("Fetching live train data...")
-    driver = initialize_browser()
     selected_gate_id = station_data.get("selected_gate_id")
     gates = station_data.get("gates", [])
-    if not driver:
-        return [{"gate_id": gate.get("gate_id"), "live_trains": [], "gate_status": "Unknown"} for gate in gates]
 
     try:
-        #1. Collect all unique Junction codes:
-        unique_junction_codes = set()
-        for gate in gates:
-            j1 = gate.get("junctions", {}).get("before", {})
-            j2 = gate.get("junctions", {}).get("after", {})
-            j1_code = j1.get("code", j1.get("name", ""))
-            j2_code = j2.get("code", j2.get("name", ""))
-            if j1_code:
-                unique_junction_codes.add(j1_code)
-            if j2_code:
-                unique_junction_codes.add(j2_code)
-        logging.info(f"Unique Junction codes {unique_junction_codes}")
-
-        #2. Fetch live train data for all unique junction codes:
-        all_junction_trains = {}
-        for junction_code in unique_junction_codes:
-            logging.info(f"Fetching train data for junction: {junction_code}")
-            all_junction_trains[junction_code] = await get_live_trains(driver, junction_code)
-
         #Prioritize the data if selected Gate ID exist
-        if selected_gate_id:
-            logging.info(f"Prioritizing the Selected gate: {selected_gate_id}")
-            #Find the gate's all informatino and add it to be first item
-            selected_gate_info = next((gate for gate in gates if gate['gate_id'] == selected_gate_id), None)
-
-            if selected_gate_info:
-                gates.remove(selected_gate_info) # remove from the current location
-                gates.insert(0,selected_gate_info) # Insert at 0.
-
-
-        results = []
-        current_time = datetime.now().time()
-
-        for gate in gates:
-            j1 = gate.get("junctions", {}).get("before", {})
-            j2 = gate.get("junctions", {}).get("after", {})
-            j1_code = j1.get("code", j1.get("name", ""))
-            j2_code = j2.get("code", j2.get("name", ""))
-            j1_name = j1.get("name", "")
-            j2_name = j2.get("name", "")
-            gate_lat = gate.get("position", {}).get("latitude")
-            gate_lon = gate.get("position", {}).get("longitude")
-            j1_lat = j1.get("position", {}).get("latitude")
-            j1_lon = j1.get("position", {}).get("longitude")
-            j2_lat = j2.get("position", {}).get("latitude")
-            j2_lon = gate.get("position", {}).get("longitude")
-            nearest = gate.get("nearest_station", {})
-            adjacent = gate.get("adjacent_stations", {})
-            nearest_name = nearest.get("name", "")
-            nearest_code = nearest.get("code", "")
-            before_name = adjacent.get("before", {}).get("name", "")
-            before_code = adjacent.get("before", {}).get("code", "")
-            after_name = adjacent.get("after", {}).get("name", "")
-            after_code = adjacent.get("after", {}).get("code", "")
-
-            if not (j1_code and j2_code and gate_lat and gate_lon and j1_lat and j1_lon and j2_lat and j2_lon):
-                logging.warning(f"Skipping gate {gate.get('gate_id')} due to missing data")
-                results.append({"gate_id": gate.get("gate_id"), "live_trains": [], "gate_status": "Unknown"})
-                continue
-
-            #3. Retrieve trains from the pre-fetched data:
-            j1_trains = all_junction_trains.get(j1_code, [])
-            j2_trains = all_junction_trains.get(j2_code, [])
-
-
-            filtered_trains = []
-            for j1_train in j1_trains:
-                for j2_train in j2_trains:
-                    if j1_train["trainNumber"] == j2_train["trainNumber"]:
-                        j1_departure = extract_time(j1_train["schedule"]["departure"])
-                        j2_departure = extract_time(j2_train["schedule"]["departure"])
-                        if j1_departure and j2_departure:
-                            j1_time = datetime.strptime(j1_departure, "%H:%M")
-                            j2_time = datetime.strptime(j2_departure, "%H:%M")
-                            direction = "J1 to J2" if j1_time < j2_time else "J2 to J1"
-                            train_data = j1_train if direction == "J1 to J2" else j2_train
-                            train_data["direction"]["from"] = j1_code if direction == "J1 to J2" else j2_code
-                            train_data["direction"]["to"] = j2_code if direction == "J1 to J2" else j1_code
-                            train_data["schedule"]["arrival_at_J1"] = j1_train["schedule"]["arrival"]
-                            train_data["schedule"]["departure_at_J1"] = j1_departure
-                            train_data["schedule"]["arrival_at_J2"] = j2_train["schedule"]["arrival"]
-                            train_data["schedule"]["departure_at_J2"] = j2_departure
-
-                            gate_pass_time = approximate_gate_passage_time(
-                                j1_departure, j2_departure, j1_lat, j1_lon, j2_lat, j2_lon, gate_lat, gate_lon
-                            )
-                            if gate_pass_time:
-                                train_data["schedule"]["gate_passage"] = gate_pass_time
-                                logging.info(f"Train {train_data['trainNumber']} gate passage: {gate_pass_time}, Within 2 hours: {is_within_two_hours(gate_pass_time, current_time)}")
-                                if is_within_two_hours(gate_pass_time, current_time):
-                                    filtered_trains.append(train_data)
-
-            live_trains = sorted(filtered_trains, key=lambda x: datetime.strptime(extract_time(x["schedule"]["gate_passage"]), "%H:%M").time())
-            gate_status = "Closed" if live_trains else "Open"
-
-            log_output = f"\nGATE: {gate.get('gate_id')}\n"
-            log_output += f"NEAREST STATION: {nearest_name} ({nearest_code})\n"
-            log_output += f"ADJACENT STATIONS: {before_name} ({before_code}) - {after_name} ({after_code})\n"
-            log_output += f"JUNCTION STATIONS: {j1_name} ({j1_code}) - {j2_name} ({j2_code})\n"
-            log_output += "TRAINS PASSING WITH TIME:\n"
-            if live_trains:
-                for train in live_trains:
-                    log_output += f"- {train['trainNumber']} ({train['trainName']}): J1 {train['schedule']['arrival_at_J1']}/{train['schedule']['departure_at_J1']} -> J2 {train['schedule']['arrival_at_J2']}/{train['schedule']['departure_at_J2']}, Gate Passage: {train['schedule']['gate_passage']}\n"
-            else:
-                log_output += "- None\n"
-            log_output += f"GATE STATUS: {gate_status}"
-            logging.info(log_output)
-
-            results.append({
-                "gate_id": gate.get("gate_id"),
-                "live_trains": live_trains,
-                "gate_status": gate_status
-            })
-
-        return results
+        prioritize_selected_gate(gates, selected_gate_id)
+        results_by_gate = {}
+        async for gate, result in stream_live_train_data({"gates": gates, "selected_gate_id": selected_gate_id}):
+            results_by_gate[id(gate)] = result
+        return [results_by_gate[id(gate)] for gate in gates]
 
     except Exception as e:
         logging.error(f"Error in fetch_live_train_data: {e}")
         return [{"gate_id": gate.get("gate_id"), "live_trains": [], "gate_status": "Unknown"} for gate in gates]
-
-    finally:
-        logging.info("Closing browser...")
-        if driver:
-            driver.quit()
\ No newline at end of file
@@ -2,41 +2,70 @@ import os
 import json
 import logging
 import asyncio
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-from pprint import pformat
+import atexit
 import concurrent.futures
-from NTES_scraper import fetch_live_train_data
-
-app = Flask(__name__)
-CORS(app)
-
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('railway_gate.log'),
-        logging.StreamHandler()
-    ]
+import time
+from quart import Quart, request, jsonify, g
+from quart_cors import cors
+from hypercorn.asyncio import serve
+from hypercorn.config import Config
+import geometry
+from functools import lru_cache
+from route_geometry import RouteGeometry
+from spatial_index import SpatialIndex
+from gate_registry import GateRegistry, make_gate_id
+from gate_catalog import GateCatalog
+from station_table import StationTable
+import metrics
+from closure_index import ClosureIndex, passage_timestamps
+from response_cache import ResponseCache, canonical_request_key
+from datetime import datetime
+from log_pipeline import Payload, configure_logging, sample_payload
+from NTES_scraper import (
+    fetch_live_train_data, stream_live_train_data, browser_pool, junction_cache, junction_poller,
+    scrape_scheduler, gate_track_position, predict_gate_passages, board_with_timetable,
+    SCRAPER_BACKEND, JUNCTION_STORE
 )
 
-STATIONS_JSON_PATH = r"H:\RGTApp\RGT\backend\kerala_railway_stations.json"
+app = Quart(__name__)
+app = cors(app)
+
+configure_logging('railway_gate.log')
+
+POLLER_ENABLED = os.getenv("RGT_POLLER_ENABLED", "1") == "1"
+
+GATE_REGISTRY_PATH = os.getenv(
+    "RGT_GATE_REGISTRY_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "gate_registry.json")
+)
+
+# Gates a client identifies only by coordinates are kept in memory, most recently used first.
+ADHOC_GATE_CACHE_SIZE = int(os.getenv("RGT_ADHOC_GATE_CACHE_SIZE", "4096"))
+
+PREBUILT_GATES_PATH = os.getenv(
+    "RGT_PREBUILT_GATES_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "kerala_gates.json")
+)
+
+# A gate closes this long before a predicted passage and reopens this long after it.
+CLOSURE_PRE_SECONDS = int(os.getenv("RGT_CLOSURE_PRE_SECONDS", "300"))
+CLOSURE_POST_SECONDS = int(os.getenv("RGT_CLOSURE_POST_SECONDS", "120"))
+
+# Identical /railway_data requests within the same RGT_RESPONSE_TTL-second bucket share one response; 0 disables.
+RESPONSE_TTL = int(os.getenv("RGT_RESPONSE_TTL", "10"))
+RESPONSE_CACHE_ENTRIES = int(os.getenv("RGT_RESPONSE_CACHE_ENTRIES", "256"))
+RESPONSE_CACHE_BYTES = int(os.getenv("RGT_RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+STATIONS_JSON_PATH = os.getenv("RGT_STATIONS_JSON_PATH", r"H:\RGTApp\RGT\backend\kerala_railway_stations.json")
 
 try:
-    with open(STATIONS_JSON_PATH, 'r', encoding='utf-8') as f:
-        all_stations = json.load(f)
-    logging.info(f"Loaded {len(all_stations)} stations")
+    # Prefers the precompiled snapshot from build_station_snapshot.py next to the JSON.
+    stations = StationTable.load(STATIONS_JSON_PATH)
+    logging.info(f"Loaded {len(stations)} stations")
 except Exception as e:
     logging.error(f"Failed to load station data: {str(e)}")
     exit(1)
 
-route_sequences = {}
-for station in all_stations:
-    routes = station['route'] if isinstance(station['route'], list) else [station['route']]
-    for route in routes:
-        if route not in route_sequences:
-            route_sequences[route] = []
-        route_sequences[route].append(station)
+# Station indices of each route, in sequence order.
+route_sequences = {route: stations.route_station_ids(route) for route in stations.route_names}
 
 junctions = {
     "TVC": {"name": "Thiruvananthapuram Central", "code": "TVC", "lat": 8.5241391, "lon": 76.9366376},
@@ -47,6 +76,19 @@ junctions = {
     "SCT": {"name": "Sengottai", "code": "SCT", "lat": 8.9755, "lon": 77.2498}
 }
 
+gate_registry = GateRegistry(GATE_REGISTRY_PATH, max_transient=ADHOC_GATE_CACHE_SIZE)
+try:
+    gate_registry.load()
+except Exception as e:
+    logging.error(f"Failed to load gate registry, starting empty: {str(e)}")
+
+# Station coordinates pre-converted to radians for the batch geometry path.
+station_lat_rad, station_lon_rad = stations.lat_rad, stations.lon_rad
+route_station_rad = {
+    route: (stations.lat_rad[ids], stations.lon_rad[ids])
+    for route, ids in route_sequences.items()
+}
+
 route_junctions = {
     "Trivandrum to Kollam": {"J1": junctions["NCJ"], "J2": junctions["QLN"]},
     "Kollam to Kayamkulam": {"J1": junctions["QLN"], "J2": junctions["KYJ"]},
@@ -55,43 +97,73 @@ route_junctions = {
     "Kollam - Aryankavu": {"J1": junctions["QLN"], "J2": junctions["SCT"]}
 }
 
-def haversine(lat1, lon1, lat2, lon2):
-    from math import radians, sin, cos, sqrt, atan2
-    R = 6371
-    dlat = radians(lat2 - lat1)
-    dlon = radians(lon2 - lon1)
-    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
-    c = 2 * atan2(sqrt(a), sqrt(1 - a))
-    return R * c
+# Linear referencing: each route's station sequence with cumulative km, and where its junctions sit on it.
+route_geometries = {
+    route: RouteGeometry(zip(stations.lat[ids].tolist(), stations.lon[ids].tolist()))
+    for route, ids in route_sequences.items()
+}
+route_junction_chainage = {
+    route: (route_geometries[route].locate(j['J1']['lat'], j['J1']['lon']),
+            route_geometries[route].locate(j['J2']['lat'], j['J2']['lon']))
+    for route, j in route_junctions.items() if route in route_geometries
+}
+
+@lru_cache(maxsize=65536)
+def _gate_chainage(route, lat, lon):
+    return route_geometries[route].locate(lat, lon)
 
-def detect_route_near_junction(gate_lat, gate_lon, route_coordinates):
-    min_dist = float('inf')
-    closest_coord = None
-    for coord in route_coordinates:
-        dist = haversine(gate_lat, gate_lon, coord['latitude'], coord['longitude'])
-        if dist < min_dist:
-            min_dist = dist
-            closest_coord = coord
+def gate_chainage(route, gate_lat, gate_lon):
+    """Chainage of a gate and its junctions on `route`, or None if the route has no geometry."""
+    if route not in route_junction_chainage:
+        return None
+    # Quantize to ~1 m so repeat requests for the same gate hit the cache.
+    gate_km = _gate_chainage(route, round(gate_lat, 5), round(gate_lon, 5))
+    j1_km, j2_km = route_junction_chainage[route]
+    return {'gate': round(gate_km, 3), 'J1': round(j1_km, 3), 'J2': round(j2_km, 3)}
+
+@lru_cache(maxsize=32)
+def _route_index(route_points):
+    return SpatialIndex(route_points)
 
-    closest_station = min(all_stations,
-                         key=lambda s: haversine(closest_coord['latitude'], closest_coord['longitude'], s['lat'], s['lon']))
+def route_index_for(route_coordinates):
+    """KD-tree over a client's route coordinates; clients resend the same route, so recent trees are kept."""
+    return _route_index(tuple((coord['latitude'], coord['longitude']) for coord in route_coordinates))
 
-    routes = closest_station['route'] if isinstance(closest_station['route'], list) else [closest_station['route']]
-    return routes[0] if routes else None
+@metrics.span("locate_gates")
+def locate_gates(gate_positions, route_coordinates):
+    """Route and nearest/adjacent stations for every gate.
 
-def find_nearest_station_and_adjacents(gate_lat, gate_lon, route):
-    if route not in route_sequences:
-        return None, None, None
+    Takes (lat, lon) pairs for every gate and returns a (route, N, O1, O2) tuple per gate,
+    with stations as StationTable indices. Each gate's closest route coordinate comes from a
+    KD-tree over the client's route (O(log n) per gate); the station steps run against the
+    fixed station table as vectorized distance matrices.
+    """
+    if not gate_positions or not route_coordinates:
+        return [(None, None, None, None)] * len(gate_positions)
 
-    stations = route_sequences[route]
-    closest_idx = min(range(len(stations)),
-                     key=lambda i: haversine(gate_lat, gate_lon, stations[i]['lat'], stations[i]['lon']))
+    route_index = route_index_for(route_coordinates)
+    closest_coords = [route_coordinates[route_index.nearest(lat, lon)] for lat, lon in gate_positions]
+    gate_lat, gate_lon = geometry.to_radians([p[0] for p in gate_positions], [p[1] for p in gate_positions])
+    coord_lat, coord_lon = geometry.to_radians(
+        [c['latitude'] for c in closest_coords], [c['longitude'] for c in closest_coords]
+    )
+    closest_station = geometry.nearest_indices(coord_lat, coord_lon, station_lat_rad, station_lon_rad)
 
-    N = stations[closest_idx]
-    O1 = stations[closest_idx - 1] if closest_idx > 0 else None
-    O2 = stations[closest_idx + 1] if closest_idx < len(stations) - 1 else None
+    gates_by_route = {}
+    for gate_idx, station_idx in enumerate(closest_station):
+        gates_by_route.setdefault(stations.primary_route_of(station_idx), []).append(gate_idx)
 
-    return N, O1, O2
+    located = [None] * len(gate_positions)
+    for route, members in gates_by_route.items():
+        if route not in route_sequences:
+            for gate_idx in members:
+                located[gate_idx] = (route, None, None, None)
+            continue
+        lat, lon = route_station_rad[route]
+        nearest = geometry.nearest_indices(gate_lat[members], gate_lon[members], lat, lon)
+        for gate_idx, closest_idx in zip(members, nearest):
+            located[gate_idx] = (route, *stations.neighbours(route, int(closest_idx)))
+    return located
 
 def find_controlling_junctions(route):
     if route not in route_junctions:
@@ -113,70 +185,335 @@ def format_station(station):
         'position': {'latitude': lat, 'longitude': lon}
     }
 
+def build_gate_assignments(gate_positions, route_coordinates):
+    """Route, nearest/adjacent stations, controlling junctions and chainage for each (lat, lon)."""
+    assignments = []
+    for (gate_lat, gate_lon), (route, N, O1, O2) in zip(gate_positions, locate_gates(gate_positions, route_coordinates)):
+        J1, J2 = find_controlling_junctions(route)
+        assignments.append({
+            'position': {'latitude': gate_lat, 'longitude': gate_lon},
+            'route': route,
+            'nearest_station': stations.format(N),
+            'adjacent_stations': {'before': stations.format(O1), 'after': stations.format(O2)},
+            'junctions': {'before': format_station(J1), 'after': format_station(J2)},
+            'chainage': gate_chainage(route, gate_lat, gate_lon)
+        })
+    return assignments
+
+def registered_at(gate):
+    """Whether the registry holds `gate` at the catalog's coordinates."""
+    known = gate_registry.get(gate["gateId"])
+    position = (known or {}).get('position') or {}
+    return position.get('latitude') == gate["latitude"] and position.get('longitude') == gate["longitude"]
+
+def load_prebuilt_gates():
+    """Load gates from the offline OSM import and make sure each one has registry assignments."""
+    try:
+        catalog = GateCatalog.load(PREBUILT_GATES_PATH)
+    except Exception as e:
+        logging.error(f"Failed to load prebuilt gates: {str(e)}")
+        return GateCatalog()
+    if catalog.gates:
+        # Only the catalog may define osm-* gates; drop any that got into the registry some other way.
+        catalog_ids = {gate["gateId"] for gate in catalog.gates}
+        gate_registry.discard([gate_id for gate_id, _ in gate_registry.items()
+                               if gate_id.startswith("osm-") and gate_id not in catalog_ids])
+    unregistered = [gate for gate in catalog.gates if not registered_at(gate)]
+    if unregistered:
+        # Without a client route, the nearest "route coordinate" to a crossing is the crossing itself.
+        positions = [(gate["latitude"], gate["longitude"]) for gate in unregistered]
+        route_points = [{'latitude': lat, 'longitude': lon} for lat, lon in positions]
+        for gate, assignment in zip(unregistered, build_gate_assignments(positions, route_points)):
+            gate_registry.register(gate["gateId"], assignment)
+    try:
+        gate_registry.save()
+    except Exception as e:
+        logging.error(f"Failed to save gate registry: {str(e)}")
+    catalog.assign_routes({gate_id: info.get('route') for gate_id, info in gate_registry.items()})
+    return catalog
+
+gate_catalog = load_prebuilt_gates()
+
+closure_index = ClosureIndex(CLOSURE_PRE_SECONDS, CLOSURE_POST_SECONDS)
+
+def record_closures(gate_info, live_trains):
+    """Update a served gate's closure timeline from the prediction just made for it.
+
+    Only persistent gates are indexed; ad-hoc gates come and go with the registry's
+    LRU and would grow the index without bound.
+    """
+    registry_id = gate_info.get("registry_id")
+    if live_trains.get("gate_status") != "Unknown" and registry_id and gate_registry.persists(registry_id):
+        closure_index.update_gate(gate_info["registry_id"], gate_info.get("route"),
+                                  passage_timestamps(live_trains["live_trains"]))
+
+def index_gates_by_junction():
+    """Registered gates with a track position, grouped under each of their two junctions."""
+    by_junction = {}
+    for gate_id, info in gate_registry.items():
+        track_position = gate_track_position(info)
+        if track_position is None:
+            continue
+        for code in set(track_position[:2]):
+            by_junction.setdefault(code, []).append((gate_id, info.get("route"), track_position))
+    return by_junction
+
+# The persistent registry only changes at startup, so this is built once.
+gates_by_junction = index_gates_by_junction()
+
+def refresh_closures(junction_code):
+    """Recompute timelines of registered gates controlled by `junction_code` after its board is refreshed.
+
+    Predicts from the same timetable-plus-live boards as the request path, so a
+    gate's timeline doesn't depend on which path updated it last.
+    """
+    now = datetime.now()
+    now_minutes = now.hour * 60 + now.minute
+    boards = {}
+    pair_joins = {}
+    for gate_id, route, track_position in gates_by_junction.get(junction_code, ()):
+        for code in track_position[:2]:
+            if code not in boards:
+                boards[code] = board_with_timetable(code, junction_cache.peek(code), now_minutes)
+        live_trains = predict_gate_passages(track_position, boards, pair_joins, now_minutes)
+        if live_trains is not None:
+            closure_index.update_gate(gate_id, route, passage_timestamps(live_trains, now))
+
+# Off the scrape worker that delivered the board; one thread keeps refreshes in board order.
+closure_refresher = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="closure-refresh")
+atexit.register(closure_refresher.shutdown, wait=False)
+junction_cache.subscribe(lambda junction_code, trains: closure_refresher.submit(refresh_closures, junction_code))
+
+response_cache = ResponseCache(RESPONSE_TTL, RESPONSE_CACHE_ENTRIES, RESPONSE_CACHE_BYTES)
+
+@app.before_serving
+async def start_background_work():
+    loop = asyncio.get_running_loop()
+    # The HTTP backend only needs Chrome as a fallback, so let the pool start lazily. With a shared
+    # junction store only the worker holding a junction's lease scrapes, so don't start Chrome in every worker.
+    if SCRAPER_BACKEND == "selenium" and not JUNCTION_STORE:
+        await loop.run_in_executor(None, browser_pool.warm)
+    if POLLER_ENABLED:
+        junction_poller.start(junctions.keys())
+
+@app.after_serving
+async def stop_background_work():
+    junction_poller.stop()
+
+@app.before_request
+async def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+async def observe_request_latency(response):
+    started = getattr(g, "request_started", None)
+    if started is not None:
+        metrics.REQUEST_SECONDS.labels(request.url_rule.rule if request.url_rule else "unmatched",
+                                       str(response.status_code)).observe(time.perf_counter() - started)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+async def prometheus_metrics():
+    body, content_type = metrics.render()
+    return body, 200, {"Content-Type": content_type}
+
+@app.route('/closures/<gate_id>', methods=['GET'])
+async def gate_closures(gate_id):
+    """Closure intervals (epoch seconds) predicted for one registered gate (ad-hoc coordinate gates have no timeline)."""
+    if not gate_registry.persists(gate_id):
+        return jsonify({"error": "Unknown gate ID", "gateId": gate_id}), 404
+    now = time.time()
+    return jsonify({
+        "gateId": gate_id,
+        "closures": [{"start": start, "end": end} for start, end in closure_index.timeline(gate_id)],
+        "closedNow": closure_index.is_closed(gate_id, now)
+    }), 200
+
+@app.route('/closures', methods=['GET'])
+async def route_closures():
+    """Gates on ?route= closed at ?at= (epoch seconds, default now) and when they will all be open."""
+    route = request.args.get('route')
+    if not route:
+        return jsonify({"error": "Expected 'route'"}), 400
+    try:
+        at = float(request.args.get('at', time.time()))
+    except ValueError:
+        return jsonify({"error": "'at' must be epoch seconds"}), 400
+    return jsonify({
+        "route": route,
+        "at": at,
+        "closedGates": closure_index.closed_gates(route, at),
+        "allOpenAt": closure_index.all_open_at(route, at)
+    }), 200
+
+@app.route('/junctions/snapshot', methods=['GET'])
+async def junction_snapshot():
+    return jsonify({
+        "polling": junction_poller.running,
+        "age_seconds": junction_poller.snapshot_ages(),
+        "scheduler": scrape_scheduler.snapshot()
+    }), 200
+
+@app.route('/gates', methods=['GET'])
+async def list_gates():
+    """Prebuilt gates inside ?bbox=minLat,minLon,maxLat,maxLon or on ?route=<route name>."""
+    bbox = request.args.get('bbox')
+    route = request.args.get('route')
+    if bbox:
+        try:
+            min_lat, min_lon, max_lat, max_lon = (float(v) for v in bbox.split(','))
+        except ValueError:
+            return jsonify({"error": "Expected bbox=minLat,minLon,maxLat,maxLon"}), 400
+        gates = gate_catalog.in_bbox(min_lat, min_lon, max_lat, max_lon)
+    elif route:
+        gates = gate_catalog.on_route(route)
+    else:
+        return jsonify({"error": "Expected a 'bbox' or 'route' query parameter"}), 400
+
+    gates = [{**gate, 'gateNumber': i + 1, 'name': f"Gate {i + 1}"} for i, gate in enumerate(gates)]
+    return jsonify({"gates": gates}), 200
+
+class PayloadError(Exception):
+    """Client sent a /railway_data body we can't process; carries the JSON error body."""
+
+    def __init__(self, body):
+        super().__init__(body.get("error"))
+        self.body = body
+
+async def prepare_gates(data):
+    """Validate a /railway_data body and attach route/station/junction assignments to every gate."""
+    gates = data.get('gates', [])
+    gate_ids = data.get('gateIds', [])
+    route_coordinates = data.get('routeCoordinates', [])
+    selected_gate_id = data.get('selectedGateId') # Extract selectedGateId
+
+    if not isinstance(gates, list) or not isinstance(route_coordinates, list) or not isinstance(gate_ids, list):
+        app.logger.error("Invalid data format")
+        raise PayloadError({"error": "Expected 'gates', 'gateIds' and 'routeCoordinates' as arrays"})
+
+    # Clients may name gates the server knows (prebuilt catalog or registry), never define new IDs.
+    unknown_ids = [gate_id for gate_id in gate_ids if gate_id not in gate_registry]
+    unknown_ids += [gate['gateId'] for gate in gates
+                    if isinstance(gate, dict) and gate.get('gateId') and gate['gateId'] not in gate_registry]
+    if unknown_ids:
+        app.logger.error(f"Unknown gate IDs: {unknown_ids}")
+        raise PayloadError({"error": "Unknown gate IDs", "gateIds": unknown_ids})
+
+    app.logger.info(f"Processing {len(gates)} gates and {len(gate_ids)} registered gate IDs with {len(route_coordinates)} route coordinates. Selected Gate ID: {selected_gate_id}")
+
+    # Prepare the gate data with all required information; registered gates skip the geometry entirely.
+    gate_data_for_scraping = []
+    new_gates = []
+    for gate in gates:
+        gate_lat = gate.get('crossingCenter', {}).get('latitude', gate['latitude'])
+        gate_lon = gate.get('crossingCenter', {}).get('longitude', gate['longitude'])
+        registry_id = gate.get('gateId') or make_gate_id(gate_lat, gate_lon)
+        gate_info = {'gate_id': gate['gateNumber'], 'registry_id': registry_id}
+        known = gate_registry.get(registry_id)
+        if known:
+            gate_info.update(known)
+        else:
+            new_gates.append((gate_info, (gate_lat, gate_lon)))
+        gate_data_for_scraping.append(gate_info)
+    for gate_id in gate_ids:
+        gate_data_for_scraping.append({'gate_id': gate_id, 'registry_id': gate_id, **gate_registry.get(gate_id)})
+
+    if new_gates:
+        app.logger.info(f"Assigning {len(new_gates)} ad-hoc gates")
+        assignments = build_gate_assignments([position for _, position in new_gates], route_coordinates)
+        for (gate_info, _), assignment in zip(new_gates, assignments):
+            gate_info.update(gate_registry.register(gate_info['registry_id'], assignment, persist=False))
+
+    return gate_data_for_scraping, selected_gate_id
+
+def merge_live_data(gate_info, live_trains):
+    gate_info["live_trains"] = live_trains["live_trains"]
+    gate_info["gate_status"] = live_trains["gate_status"]
+    gate_info["data_age_seconds"] = live_trains.get("data_age_seconds")
+    return gate_info
+
+async def build_gate_results(data):
+    """Assignments plus live trains for every gate in a /railway_data body, selected gate first."""
+    with metrics.span("prepare_gates"):
+        gate_data_for_scraping, selected_gate_id = await prepare_gates(data)
+
+    app.logger.info("Fetching live train data for all gates...")
+    # Execute scraping *once* for all gates; blocking scrapes run on the scraper's shared executor.
+    with metrics.span("live_train_data"):
+        all_live_trains_data = await fetch_live_train_data({"gates": gate_data_for_scraping, "selected_gate_id": selected_gate_id})
+
+    # Combine the scraped data with the original gate data
+    results = []
+    for gate_info, live_trains in zip(gate_data_for_scraping, all_live_trains_data):
+        record_closures(gate_info, live_trains)
+        results.append(merge_live_data(gate_info, live_trains))
+    return results
+
+def order_like_request(results, data):
+    """Results in this request's gate order (selected gate first); a cached response may come from another client's order."""
+    order = [gate.get('gateNumber') for gate in data.get('gates', [])] + list(data.get('gateIds', []))
+    position = {gate_id: i for i, gate_id in enumerate(order)}
+    if len(position) != len(results):
+        return results
+    selected_gate_id = data.get('selectedGateId')
+    return sorted(results, key=lambda gate: (gate['gate_id'] != selected_gate_id, position.get(gate['gate_id'], len(order))))
+
 @app.route('/railway_data', methods=['POST'])
-def process_gates():
+async def process_gates():
     try:
-        data = request.get_json()
+        data = await request.get_json()
         app.logger.info(f"New request from {request.remote_addr}")
-        app.logger.debug(f"Raw request data:\n{pformat(data, indent=2)}")
-
-        gates = data.get('gates', [])
-        route_coordinates = data.get('routeCoordinates', [])
-        selected_gate_id = data.get('selectedGateId') # Extract selectedGateId
-
-        if not isinstance(gates, list) or not isinstance(route_coordinates, list):
-            app.logger.error("Invalid data format")
-            return jsonify({"error": "Expected 'gates' and 'routeCoordinates' as arrays"}), 400
-
-        app.logger.info(f"Processing {len(gates)} gates with {len(route_coordinates)} route coordinates. Selected Gate ID: {selected_gate_id}")
-
-        # Prepare the gate data with all required information
-        gate_data_for_scraping = []
-        for gate in gates:
-            gate_lat = gate.get('crossingCenter', {}).get('latitude', gate['latitude'])
-            gate_lon = gate.get('crossingCenter', {}).get('longitude', gate['longitude'])
-
-            route = detect_route_near_junction(gate_lat, gate_lon, route_coordinates)
-            N, O1, O2 = find_nearest_station_and_adjacents(gate_lat, gate_lon, route)
-            J1, J2 = find_controlling_junctions(route)
-
-            gate_info = {
-                'gate_id': gate['gateNumber'],
-                'position': {'latitude': gate_lat, 'longitude': gate_lon},
-                'route': route,
-                'nearest_station': format_station(N),
-                'adjacent_stations': {'before': format_station(O1), 'after': format_station(O2)},
-                'junctions': {'before': format_station(J1), 'after': format_station(J2)}
-            }
-            gate_data_for_scraping.append(gate_info)
-
-        app.logger.info("Fetching live train data for all gates...")
-        # Execute scraping *once* for all gates
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            with concurrent.futures.ThreadPoolExecutor() as pool:
-                all_live_trains_data = loop.run_in_executor(
-                    pool,
-                    lambda: asyncio.run(fetch_live_train_data({"gates": gate_data_for_scraping, "selected_gate_id": selected_gate_id}))
-                )
-                all_live_trains_data = loop.run_until_complete(all_live_trains_data) # This will have been processed.
-        finally:
-            loop.close()
-
-        # Combine the scraped data with the original gate data
-        results = []
-        for gate_info, live_trains in zip(gate_data_for_scraping, all_live_trains_data):
-            gate_info["live_trains"] = live_trains["live_trains"]
-            gate_info["gate_status"] = live_trains["gate_status"]
-            results.append(gate_info)
-
-        app.logger.debug(f"Final response:\n{pformat({'gates': results}, indent=2)}")
-        return jsonify({"gates": results}), 200
+        log_payloads = app.logger.isEnabledFor(logging.DEBUG) and sample_payload()
+        if log_payloads:
+            app.logger.debug("Raw request data:\n%s", Payload(data))
+
+        key = canonical_request_key(data) if isinstance(data, dict) else None
+        if key is None or RESPONSE_TTL <= 0:
+            results = await build_gate_results(data)
+        else:
+            results = order_like_request(await response_cache.get_or_compute(key, lambda: build_gate_results(data)), data)
 
+        if log_payloads:
+            app.logger.debug("Final response:\n%s", Payload({'gates': results}))
+        with metrics.span("serialization"):
+            response = jsonify({"gates": results})
+        return response, 200
+
+    except PayloadError as e:
+        return jsonify(e.body), 400
     except Exception as e:
         app.logger.error(f"Error processing gates: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@app.route('/railway_data/stream', methods=['POST'])
+async def stream_gates():
+    """Same body as /railway_data, answered as NDJSON: one gate per line, the selected gate first."""
+    try:
+        data = await request.get_json()
+        app.logger.info(f"New streaming request from {request.remote_addr}")
+        gate_data_for_scraping, selected_gate_id = await prepare_gates(data)
+    except PayloadError as e:
+        return jsonify(e.body), 400
+    except Exception as e:
+        app.logger.error(f"Error processing gates: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
+
+    async def generate():
+        try:
+            async for gate_info, live_trains in stream_live_train_data(
+                {"gates": gate_data_for_scraping, "selected_gate_id": selected_gate_id}
+            ):
+                record_closures(gate_info, live_trains)
+                with metrics.span("serialization"):
+                    line = json.dumps(merge_live_data(gate_info, live_trains)) + "\n"
+                yield line
+        except Exception as e:
+            app.logger.error(f"Error streaming gates: {str(e)}")
+            yield json.dumps({"error": "Internal server error"}) + "\n"
+
+    return app.response_class(generate(), mimetype="application/x-ndjson")
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    config = Config()
+    config.bind = ["0.0.0.0:5000"]
+    asyncio.run(serve(app, config))
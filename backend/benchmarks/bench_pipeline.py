@@ -0,0 +1,247 @@
+"""Offline benchmark for the /railway_data pipeline.
+
+Usage:
+    python benchmarks/bench_pipeline.py [--gates 10,100,1000] [--route-points 2000]
+                                        [--concurrency 1,4,16] [--requests 64] [--repeat 5]
+                                        [--fixtures DIR] [--fresh-gates] [--cold-boards] [--response-cache]
+
+Gates and route coordinates are synthesized along the real routes in kerala_railway_stations.json.
+NTES is replaced by recorded station boards from --fixtures (see record_fixtures.py); junctions
+without a recording get a synthetic board with trains running between each junction pair. No
+recordings are checked in, so unless you record some first the run is fully synthetic; the
+"Boards:" line says which junctions were which.
+
+Reports per-stage timings for one request (gate location, batch assignment, junction scrape,
+train join, serialization) and end-to-end throughput through the Quart app at each concurrency
+level. The throughput loop replays one payload, so the /railway_data response cache is off unless
+--response-cache is given; with it, the figures measure cache hits, not the pipeline.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_FIXTURE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--gates", default="10,100,1000", help="comma-separated gate counts to sweep")
+    parser.add_argument("--route-points", type=int, default=2000, help="route coordinates per payload")
+    parser.add_argument("--routes", type=int, default=0, help="spread gates over this many routes (0 = all)")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=64, help="requests per concurrency level")
+    parser.add_argument("--repeat", type=int, default=5, help="repetitions per stage timing")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR, help="directory of recorded <CODE>.html boards")
+    parser.add_argument("--fresh-gates", action="store_true", help="jitter gates per request so none hit the registry")
+    parser.add_argument("--cold-boards", action="store_true", help="disable the junction cache so every request scrapes")
+    parser.add_argument("--response-cache", action="store_true",
+                        help="keep the /railway_data response cache on (throughput then measures cache hits)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's INFO/WARNING logging")
+    return parser.parse_args()
+
+
+args = parse_args()
+random.seed(args.seed)
+
+# The backend reads its configuration at import time.
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(tempfile.mkdtemp(prefix="rgt-bench-"))  # keeps the scraper's log file out of the tree
+os.environ["RGT_SCRAPER_BACKEND"] = "fixture"
+os.environ["RGT_POLLER_ENABLED"] = "0"
+os.environ.setdefault("RGT_STATIONS_JSON_PATH", os.path.join(BACKEND_DIR, "kerala_railway_stations.json"))
+os.environ["RGT_GATE_REGISTRY_PATH"] = os.path.join(os.getcwd(), "gate_registry.json")
+os.environ["RGT_PREBUILT_GATES_PATH"] = os.path.join(os.getcwd(), "kerala_gates.json")
+os.environ["RGT_TIMETABLE_PATH"] = os.path.join(os.getcwd(), "kerala_timetable.db")
+if not args.response_cache:
+    os.environ["RGT_RESPONSE_TTL"] = "0"
+if args.cold_boards:
+    os.environ["RGT_JUNCTION_TTL"] = "0"
+    os.environ["RGT_JUNCTION_STALE_TTL"] = "0"
+
+import backend  # noqa: E402
+import NTES_scraper  # noqa: E402
+from ntes_fixtures import FixtureBoardSource, fixture_path, render_station_board, save_fixture  # noqa: E402
+
+if not args.verbose:
+    logging.getLogger().setLevel(logging.ERROR)
+    backend.app.logger.setLevel(logging.ERROR)
+
+
+def prepare_fixtures(directory):
+    """Point the scraper at `directory`, synthesizing boards for junctions that have no recording."""
+    synthetic_dir = os.path.join(os.getcwd(), "fixtures")
+    recorded = {code for code in backend.junctions if os.path.exists(fixture_path(directory, code))}
+    boards = {code: [] for code in backend.junctions if code not in recorded}
+    now = datetime.now()
+    train_no = 16000
+    for route, pair in backend.route_junctions.items():
+        j1, j2 = pair["J1"]["code"], pair["J2"]["code"]
+        for _ in range(12):
+            train_no += 1
+            first, second = (j1, j2) if train_no % 2 else (j2, j1)
+            depart = now + timedelta(minutes=random.randint(5, 80))
+            arrive = depart + timedelta(minutes=random.randint(25, 90))
+            train_text = f"{train_no} | BENCH EXP {train_no} ({first}-{second})"
+            for code, when in ((first, depart), (second, arrive)):
+                if code in boards:
+                    stamp = when.strftime("%H:%M")
+                    boards[code].append((train_text, f"{stamp}\nOn Time", f"{stamp}\nOn Time"))
+    for code, rows in boards.items():
+        save_fixture(synthetic_dir, code, render_station_board(rows), recorded_at=now)
+    for code in recorded:
+        with open(fixture_path(directory, code), "r", encoding="utf-8") as src:
+            with open(fixture_path(synthetic_dir, code), "w", encoding="utf-8") as dst:
+                dst.write(src.read())
+    NTES_scraper.fixture_source = FixtureBoardSource(synthetic_dir)
+    return sorted(recorded), sorted(boards)
+
+
+def route_polyline(route):
+    ids = backend.route_sequences[route]
+    return list(zip(backend.stations.lat[ids].tolist(), backend.stations.lon[ids].tolist()))
+
+
+def densify(points, count):
+    """`count` evenly spaced (by index) points along the polyline through `points`."""
+    if len(points) < 2:
+        return points * count
+    out = []
+    for k in range(count):
+        pos = k * (len(points) - 1) / max(1, count - 1)
+        i = min(int(pos), len(points) - 2)
+        t = pos - i
+        (lat1, lon1), (lat2, lon2) = points[i], points[i + 1]
+        out.append((lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t))
+    return out
+
+
+def make_payload(gate_count, route_points, routes):
+    """Synthetic /railway_data body: gates jittered ~20 m off real routes, route coordinates along them."""
+    coords, gates = [], []
+    per_route = max(1, route_points // len(routes))
+    for r, route in enumerate(routes):
+        line = densify(route_polyline(route), per_route)
+        coords.extend({"latitude": lat, "longitude": lon} for lat, lon in line)
+        share = gate_count // len(routes) + (1 if r < gate_count % len(routes) else 0)
+        for lat, lon in random.sample(line, min(share, len(line))):
+            lat += random.uniform(-0.0002, 0.0002)
+            lon += random.uniform(-0.0002, 0.0002)
+            gates.append({"gateNumber": len(gates) + 1, "latitude": lat, "longitude": lon,
+                          "crossingCenter": {"latitude": lat, "longitude": lon}})
+    return {"gates": gates, "routeCoordinates": coords, "selectedGateId": 1 if gates else None}
+
+
+def jitter_payload(payload):
+    gates = []
+    for gate in payload["gates"]:
+        lat = gate["latitude"] + random.uniform(-0.001, 0.001)
+        lon = gate["longitude"] + random.uniform(-0.001, 0.001)
+        gates.append({**gate, "latitude": lat, "longitude": lon, "crossingCenter": {"latitude": lat, "longitude": lon}})
+    return {**payload, "gates": gates}
+
+
+def timed(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, samples
+
+
+def stage_timings(payload, repeat):
+    """Run each pipeline stage on its own, the way one /railway_data request does."""
+    route = payload["routeCoordinates"]
+    positions = [(g["latitude"], g["longitude"]) for g in payload["gates"]]
+    stages = {}
+
+    # Route detection and station lookup for every gate, as one batch.
+    _, stages["locate_gates"] = timed(lambda: backend.locate_gates(positions, route), repeat)
+
+    # locate_gates plus junctions, chainage and formatting: everything a new gate costs.
+    assignments, stages["batch_assignment"] = timed(lambda: backend.build_gate_assignments(positions, route), repeat)
+    gates = [{"gate_id": g["gateNumber"], **a} for g, a in zip(payload["gates"], assignments)]
+
+    codes = sorted({code for gate in gates for code in NTES_scraper.gate_junction_codes(gate) if code})
+    boards, stages["junction_scrape"] = timed(lambda: {code: NTES_scraper.scrape_junction(code) for code in codes}, repeat)
+
+    now = datetime.now()
+    now_minutes = now.hour * 60 + now.minute
+    live, stages["train_join"] = timed(
+        lambda: [NTES_scraper.resolve_gate(gate, boards, {}, now_minutes) for gate in gates], repeat)
+
+    merged = [backend.merge_live_data(dict(gate), result) for gate, result in zip(gates, live)]
+    _, stages["serialization"] = timed(lambda: json.dumps({"gates": merged}), repeat)
+    return stages, len(codes), sum(len(r["live_trains"]) for r in live)
+
+
+async def throughput(payload, levels, total):
+    """Requests/s and latency percentiles through the Quart app at each concurrency level."""
+    results = {}
+    async with backend.app.test_app() as test_app:
+        client = test_app.test_client()
+        await client.post("/railway_data", json=payload)  # register gates and warm caches
+        for level in levels:
+            latencies = []
+            semaphore = asyncio.Semaphore(level)
+
+            async def one():
+                body = jitter_payload(payload) if args.fresh_gates else payload
+                async with semaphore:
+                    start = time.perf_counter()
+                    response = await client.post("/railway_data", json=body)
+                    await response.get_data()
+                    latencies.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        raise Exception(f"/railway_data returned {response.status_code}")
+
+            start = time.perf_counter()
+            await asyncio.gather(*(one() for _ in range(total)))
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            results[level] = {
+                "rps": total / elapsed,
+                "p50": latencies[len(latencies) // 2],
+                "p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+            }
+    return results
+
+
+def main():
+    recorded, synthetic = prepare_fixtures(args.fixtures)
+    print(f"Boards: recorded {recorded or '-'}, synthetic {synthetic or '-'}")
+    if not recorded:
+        print(f"No recorded boards in {args.fixtures}; every junction board is synthetic.")
+    routes = [route for route in backend.route_sequences if route in backend.route_junctions]
+    if args.routes:
+        routes = routes[:args.routes]
+    levels = [int(level) for level in args.concurrency.split(",")]
+
+    for gate_count in (int(n) for n in args.gates.split(",")):
+        payload = make_payload(gate_count, args.route_points, routes)
+        stages, junction_count, train_count = stage_timings(payload, args.repeat)
+        print(f"\n== {len(payload['gates'])} gates, {len(payload['routeCoordinates'])} route points, "
+              f"{junction_count} junctions, {train_count} gate passages ==")
+        print(f"{'stage':<18}{'min ms':>10}{'median ms':>12}")
+        for stage, samples in stages.items():
+            print(f"{stage:<18}{min(samples):>10.2f}{statistics.median(samples):>12.2f}")
+
+        cache_note = "response cache on" if args.response_cache else "response cache off"
+        print(f"{'concurrency':<18}{'req/s':>10}{'p50 ms':>12}{'p95 ms':>10}  ({cache_note})")
+        for level, row in asyncio.run(throughput(payload, levels, args.requests)).items():
+            print(f"{level:<18}{row['rps']:>10.1f}{row['p50']:>12.1f}{row['p95']:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
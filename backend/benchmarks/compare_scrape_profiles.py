@@ -0,0 +1,87 @@
+"""Compare live Selenium scrape timings between browser profiles.
+
+Usage:
+    python benchmarks/compare_scrape_profiles.py [--profiles full,fast] [--rounds 3] [CODE ...]
+
+Needs Chrome and network access to NTES. For each profile, one browser is started and every junction
+is scraped `--rounds` times in turn, the way a pooled session serves successive scrapes. Reports the
+browser start time, the first scrape (which includes navigating to the form) and the median of the
+rest, plus trains found, so a profile that is faster because it scraped nothing stands out.
+"""
+import argparse
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JUNCTION_CODES = ["TVC", "QLN", "KYJ", "ERS", "NCJ", "SCT"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("codes", nargs="*", default=JUNCTION_CODES, help="junction codes to scrape")
+    parser.add_argument("--profiles", default="full,fast", help="comma-separated profiles to compare")
+    parser.add_argument("--rounds", type=int, default=3, help="passes over the junction list per profile")
+    parser.add_argument("--verbose", action="store_true", help="keep the scraper's INFO/WARNING logging")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# The scraper reads its configuration at import time.
+sys.path.insert(0, BACKEND_DIR)
+os.chdir(tempfile.mkdtemp(prefix="rgt-profiles-"))  # keeps the scraper's log file out of the tree
+os.environ["RGT_TIMETABLE_PATH"] = os.path.join(os.getcwd(), "kerala_timetable.db")
+
+import NTES_scraper  # noqa: E402
+
+if not args.verbose:
+    logging.getLogger().setLevel(logging.ERROR)
+
+
+def run_profile(profile):
+    start = time.perf_counter()
+    driver = NTES_scraper.initialize_browser(profile)
+    startup = time.perf_counter() - start
+    if driver is None:
+        return None
+    timings = {code: [] for code in args.codes}
+    trains = {code: 0 for code in args.codes}
+    try:
+        for _ in range(args.rounds):
+            for code in args.codes:
+                start = time.perf_counter()
+                board = NTES_scraper.get_live_trains(driver, code, reuse_form=profile == "fast")
+                timings[code].append(time.perf_counter() - start)
+                trains[code] = max(trains[code], len(board or []))
+    finally:
+        driver.quit()
+    return startup, timings, trains
+
+
+def main():
+    results = {}
+    for profile in args.profiles.split(","):
+        print(f"Scraping {len(args.codes)} junctions x {args.rounds} rounds with the {profile} profile...", flush=True)
+        results[profile] = run_profile(profile)
+        if results[profile] is None:
+            print(f"  could not start a browser for the {profile} profile")
+
+    print(f"\n{'profile':<10}{'junction':<10}{'trains':>8}{'first s':>10}{'median s':>10}")
+    for profile, result in results.items():
+        if result is None:
+            continue
+        startup, timings, trains = result
+        print(f"{profile:<10}{'(start)':<10}{'':>8}{startup:>10.2f}")
+        for code, samples in timings.items():
+            rest = statistics.median(samples[1:]) if len(samples) > 1 else samples[0]
+            print(f"{profile:<10}{code:<10}{trains[code]:>8}{samples[0]:>10.2f}{rest:>10.2f}")
+        all_samples = [t for samples in timings.values() for t in samples]
+        print(f"{profile:<10}{'(all)':<10}{sum(trains.values()):>8}{'':>10}{statistics.median(all_samples):>10.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+"""Record live NTES station boards as benchmark fixtures.
+
+Usage:
+    python benchmarks/record_fixtures.py [CODE ...]
+
+Defaults to every junction the backend scrapes. Boards are saved as benchmarks/fixtures/<CODE>.html
+with the recording time, so bench_pipeline.py can replay them with times moved up to now.
+"""
+import logging
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from ntes_fixtures import record_fixture  # noqa: E402
+from ntes_http import NtesHttpClient  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+NTES_BASE_URL = "https://enquiry.indianrail.gov.in/mntes/"
+FIXTURE_DIR = os.path.join(BACKEND_DIR, "benchmarks", "fixtures")
+JUNCTION_CODES = ["TVC", "QLN", "KYJ", "ERS", "NCJ", "SCT"]
+
+if __name__ == '__main__':
+    codes = sys.argv[1:] or JUNCTION_CODES
+    client = NtesHttpClient(NTES_BASE_URL)
+    try:
+        for code in codes:
+            try:
+                path = record_fixture(client, FIXTURE_DIR, code)
+                logging.info(f"Recorded {code} to {path}")
+            except Exception as e:
+                logging.error(f"Failed to record {code}: {e}")
+    finally:
+        client.close()
@@ -0,0 +1,122 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+
+class BrowserPool:
+    """Long-lived pool of WebDriver sessions shared by every scrape in the process."""
+
+    def __init__(self, factory, size=2, max_uses=50, checkout_timeout=60):
+        self.factory = factory
+        self.size = size
+        self.max_uses = max_uses
+        self.checkout_timeout = checkout_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        self._uses = {}
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _create(self):
+        driver = self.factory()
+        if driver:
+            with self._lock:
+                self._uses[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver, reason):
+        logging.info(f"Recycling browser session ({reason})")
+        with self._lock:
+            self._uses.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.warning(f"Error while quitting browser: {e}")
+
+    @staticmethod
+    def is_healthy(driver):
+        """Cheap liveness probe: a dead chromedriver fails any command."""
+        try:
+            driver.current_url
+            return True
+        except Exception as e:
+            logging.warning(f"Browser health check failed: {e}")
+            return False
+
+    def warm(self):
+        """Start browsers until the pool is full so the first request skips the cold start."""
+        started = 0
+        while self._idle.qsize() < self.size:
+            driver = self._create()
+            if not driver:
+                break
+            self._idle.put(driver)
+            started += 1
+        logging.info(f"Browser pool warmed with {started} new session(s), {self._idle.qsize()}/{self.size} idle")
+
+    def checkout(self):
+        """Take a healthy driver from the pool, starting one if none is idle. Returns None on failure."""
+        if not self._slots.acquire(timeout=self.checkout_timeout):
+            logging.error(f"No browser session available after {self.checkout_timeout}s")
+            return None
+        try:
+            while True:
+                try:
+                    driver = self._idle.get_nowait()
+                except queue.Empty:
+                    driver = self._create()
+                    break
+                if self.is_healthy(driver):
+                    break
+                self._discard(driver, "failed health check")
+        except Exception:
+            self._slots.release()
+            raise
+        if not driver:
+            self._slots.release()
+        return driver
+
+    def checkin(self, driver, broken=False):
+        """Return a driver to the pool, recycling it if it crashed or hit its use limit."""
+        if driver is None:
+            return
+        try:
+            with self._lock:
+                uses = self._uses.get(id(driver), 0) + 1
+                self._uses[id(driver)] = uses
+            if self._closed:
+                self._discard(driver, "pool closed")
+            elif broken:
+                self._discard(driver, "crashed during scrape")
+            elif uses >= self.max_uses:
+                self._discard(driver, f"reached {uses} uses")
+            elif not self.is_healthy(driver):
+                self._discard(driver, "failed health check")
+            else:
+                self._idle.put(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def session(self):
+        """Check out a driver for the duration of a `with` block."""
+        driver = self.checkout()
+        broken = False
+        try:
+            yield driver
+        except Exception:
+            broken = True
+            raise
+        finally:
+            self.checkin(driver, broken=broken)
+
+    def close(self):
+        """Quit every idle browser; sessions still checked out are quit on checkin."""
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver, "pool closed")
@@ -0,0 +1,22 @@
+"""Compile kerala_railway_stations.json into the binary snapshot the backend loads at startup.
+
+Usage:
+    python build_station_snapshot.py [kerala_railway_stations.json] [output.npz]
+
+Re-run whenever the station JSON changes; the backend falls back to parsing the JSON
+(and logs a warning) while the snapshot is missing or older than the JSON.
+"""
+import logging
+import os
+import sys
+from station_table import build_snapshot
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_INPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kerala_railway_stations.json")
+
+if __name__ == '__main__':
+    source = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_INPUT
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+    path, count = build_snapshot(source, output)
+    logging.info(f"Compiled {count} stations into {path}")
@@ -0,0 +1,29 @@
+"""Import a static timetable into the SQLite store the scraper uses for baseline predictions.
+
+Usage:
+    python build_timetable.py timetable.json [kerala_timetable.db]
+
+timetable.json is a list of trains:
+    [{"trainNumber": "16301", "trainName": "Venad Express", "origin": "TVC", "destination": "SRR",
+      "stops": [{"station": "TVC", "arrival": null, "departure": "05:00"}, ...]}, ...]
+Stops are in running order; times are "HH:MM" local time.
+"""
+import logging
+import os
+import sys
+from timetable import Timetable, load_timetable_json
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kerala_timetable.db")
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    source = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT
+
+    trains = load_timetable_json(source)
+    Timetable(output).import_trains(trains)
+    logging.info(f"Imported {len(trains)} trains into {output}")
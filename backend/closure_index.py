@@ -0,0 +1,148 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+
+def merge_intervals(intervals):
+    """Sorted, non-overlapping union of (start, end) intervals."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def passage_timestamps(live_trains, now=None):
+    """Epoch seconds of each train's predicted gate passage ("HH:MM", within the next day)."""
+    now = (now or datetime.now()).replace(second=0, microsecond=0)
+    now_minutes = now.hour * 60 + now.minute
+    stamps = []
+    for train in live_trains:
+        passage = train.get("schedule", {}).get("gate_passage")
+        try:
+            hours, minutes = passage.split(":")
+        except (AttributeError, ValueError):
+            continue
+        ahead = (int(hours) * 60 + int(minutes) - now_minutes) % (24 * 60)
+        stamps.append((now + timedelta(minutes=ahead)).timestamp())
+    return stamps
+
+
+class IntervalTree:
+    """Static centered interval tree over (start, end, key) triples; stabbing queries in O(log n + k)."""
+
+    def __init__(self, intervals):
+        self.root = self._build(list(intervals))
+
+    def _build(self, intervals):
+        if not intervals:
+            return None
+        points = sorted(p for start, end, _ in intervals for p in (start, end))
+        center = points[len(points) // 2]
+        left = [iv for iv in intervals if iv[1] < center]
+        right = [iv for iv in intervals if iv[0] > center]
+        here = [iv for iv in intervals if iv[0] <= center <= iv[1]]
+        return (
+            center,
+            sorted(here, key=lambda iv: iv[0]),                 # by start, for t < center
+            sorted(here, key=lambda iv: iv[1], reverse=True),   # by end, for t > center
+            self._build(left),
+            self._build(right),
+        )
+
+    def stab(self, t):
+        """Keys of every interval with start <= t < end."""
+        found = []
+        node = self.root
+        while node is not None:
+            center, by_start, by_end, left, right = node
+            if t < center:
+                for start, end, key in by_start:
+                    if start > t:
+                        break
+                    if t < end:
+                        found.append(key)
+                node = left
+            else:
+                for start, end, key in by_end:
+                    if end <= t:
+                        break
+                    if start <= t:
+                        found.append(key)
+                node = right
+        return found
+
+
+class ClosureIndex:
+    """Per-gate closure timelines grouped by route.
+
+    Each predicted passage closes the gate from `pre_seconds` before to
+    `post_seconds` after it. Updating a gate replaces its timeline and marks its
+    route for a rebuild; route queries rebuild lazily, so a burst of updates
+    costs one rebuild.
+    """
+
+    def __init__(self, pre_seconds=300, post_seconds=120):
+        self.pre_seconds = pre_seconds
+        self.post_seconds = post_seconds
+        self._timelines = {}  # gate_id -> [(start, end)]
+        self._routes = {}  # gate_id -> route
+        self._route_gates = {}  # route -> set of gate_ids
+        self._route_index = {}  # route -> (IntervalTree, merged starts, merged intervals)
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def update_gate(self, gate_id, route, passages):
+        """Replace the gate's timeline with closures around `passages` (epoch seconds)."""
+        timeline = merge_intervals((t - self.pre_seconds, t + self.post_seconds) for t in passages)
+        with self._lock:
+            old_route = self._routes.get(gate_id)
+            if old_route is not None and old_route != route:
+                self._route_gates[old_route].discard(gate_id)
+                self._dirty.add(old_route)
+            self._timelines[gate_id] = timeline
+            self._routes[gate_id] = route
+            self._route_gates.setdefault(route, set()).add(gate_id)
+            self._dirty.add(route)
+
+    def timeline(self, gate_id):
+        with self._lock:
+            return list(self._timelines.get(gate_id, []))
+
+    def is_closed(self, gate_id, t):
+        with self._lock:
+            timeline = self._timelines.get(gate_id, [])
+        i = bisect.bisect_right(timeline, (t, float("inf"))) - 1
+        return i >= 0 and timeline[i][0] <= t < timeline[i][1]
+
+    def _route_index_locked(self, route):
+        if route in self._dirty or route not in self._route_index:
+            intervals = [(start, end, gate_id)
+                         for gate_id in self._route_gates.get(route, ())
+                         for start, end in self._timelines[gate_id]]
+            merged = merge_intervals((start, end) for start, end, _ in intervals)
+            self._route_index[route] = (IntervalTree(intervals), [start for start, _ in merged], merged)
+            self._dirty.discard(route)
+        return self._route_index[route]
+
+    def closed_gates(self, route, t):
+        """Gate IDs on `route` that are closed at epoch second `t`."""
+        with self._lock:
+            tree, _, _ = self._route_index_locked(route)
+        return sorted(set(tree.stab(t)))
+
+    def all_open_at(self, route, t):
+        """Earliest epoch second >= `t` at which no gate on `route` is closed."""
+        with self._lock:
+            _, starts, merged = self._route_index_locked(route)
+        i = bisect.bisect_right(starts, t) - 1
+        if i >= 0 and t < merged[i][1]:
+            return merged[i][1]
+        return t
+
+    def gates(self, route):
+        with self._lock:
+            return sorted(self._route_gates.get(route, ()))
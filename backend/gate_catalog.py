@@ -0,0 +1,42 @@
+import json
+import logging
+import os
+from bisect import bisect_left, bisect_right
+
+
+class GateCatalog:
+    """Prebuilt gates produced by import_level_crossings.py, queryable by bounding box or route."""
+
+    def __init__(self, gates=()):
+        self.gates = sorted(gates, key=lambda g: g["latitude"])
+        self._lats = [g["latitude"] for g in self.gates]
+        self._by_route = {}
+
+    @classmethod
+    def load(cls, path):
+        if not os.path.exists(path):
+            logging.info(f"No prebuilt gates at {path}, /gates will be empty")
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            catalog = cls(json.load(f))
+        logging.info(f"Loaded {len(catalog.gates)} prebuilt gates")
+        return catalog
+
+    def __len__(self):
+        return len(self.gates)
+
+    def assign_routes(self, route_for_gate_id):
+        """Tag each gate with its route so /gates?route= is a dict lookup."""
+        self._by_route = {}
+        for gate in self.gates:
+            gate["route"] = route_for_gate_id.get(gate["gateId"])
+            self._by_route.setdefault(gate["route"], []).append(gate)
+
+    def in_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        # Gates are sorted by latitude, so only the matching latitude band is scanned.
+        lo = bisect_left(self._lats, min_lat)
+        hi = bisect_right(self._lats, max_lat)
+        return [gate for gate in self.gates[lo:hi] if min_lon <= gate["longitude"] <= max_lon]
+
+    def on_route(self, route):
+        return list(self._by_route.get(route, []))
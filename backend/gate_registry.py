@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+# Fields computed once per gate and reused on every later request.
+ASSIGNMENT_FIELDS = ('position', 'route', 'nearest_station', 'adjacent_stations', 'junctions', 'chainage')
+
+
+def make_gate_id(lat, lon, osm_id=None):
+    """Stable gate ID: the OSM node ID when known, otherwise coordinates quantized to ~10 m."""
+    if osm_id is not None:
+        return f"osm-{osm_id}"
+    return f"g{lat:.4f}_{lon:.4f}"
+
+
+class GateRegistry:
+    """Persistent store of gates keyed by stable ID with their precomputed route/station/junction assignments.
+
+    Gates registered with persist=False (ad-hoc gates a client identified only by
+    coordinates) live in a bounded in-memory LRU instead and are never written out.
+    """
+
+    def __init__(self, path, max_transient=4096):
+        self.path = path
+        self.max_transient = max_transient
+        self._gates = {}
+        self._transient = OrderedDict()
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            logging.info(f"No gate registry at {self.path}, starting empty")
+            return
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self._gates = json.load(f)
+        logging.info(f"Loaded {len(self._gates)} gates from registry")
+
+    def get(self, gate_id):
+        gate = self._gates.get(gate_id)
+        if gate is not None:
+            return gate
+        with self._lock:
+            gate = self._transient.get(gate_id)
+            if gate is not None:
+                self._transient.move_to_end(gate_id)
+        return gate
+
+    def __contains__(self, gate_id):
+        return gate_id in self._gates or gate_id in self._transient
+
+    def persists(self, gate_id):
+        """Whether `gate_id` is a persistent gate rather than an ad-hoc one held in the LRU."""
+        return gate_id in self._gates
+
+    def __len__(self):
+        return len(self._gates)
+
+    def items(self):
+        return list(self._gates.items())
+
+    def register(self, gate_id, gate_info, persist=True):
+        assignment = {field: gate_info.get(field) for field in ASSIGNMENT_FIELDS}
+        with self._lock:
+            if persist:
+                self._gates[gate_id] = assignment
+                self._transient.pop(gate_id, None)
+                self._dirty = True
+            else:
+                self._transient[gate_id] = assignment
+                self._transient.move_to_end(gate_id)
+                while len(self._transient) > self.max_transient:
+                    self._transient.popitem(last=False)
+        return assignment
+
+    def discard(self, gate_ids):
+        """Drop persistent gates, e.g. IDs that are no longer in the prebuilt catalog."""
+        with self._lock:
+            for gate_id in gate_ids:
+                if self._gates.pop(gate_id, None) is not None:
+                    self._dirty = True
+
+    def save(self):
+        """Write the registry if it changed, via a temp file so a crash never leaves it half-written."""
+        with self._lock:
+            if not self._dirty:
+                return
+            snapshot = dict(self._gates)
+            self._dirty = False
+        # Per-process temp file: every Hypercorn worker may save the same registry at once.
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.path)),
+                                        prefix=os.path.basename(self.path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False)
+            os.chmod(tmp_path, 0o644)  # mkstemp creates it owner-only
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        logging.info(f"Saved {len(snapshot)} gates to registry")
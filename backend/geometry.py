@@ -0,0 +1,33 @@
+import numpy as np
+
+EARTH_RADIUS_KM = 6371
+# Upper bound on distance-matrix cells held in memory at once (~16 MB of float64).
+MAX_MATRIX_CELLS = 2_000_000
+
+
+def to_radians(lats, lons):
+    """Convert sequences of degrees into float64 radian arrays."""
+    return np.radians(np.asarray(lats, dtype=np.float64)), np.radians(np.asarray(lons, dtype=np.float64))
+
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """Great-circle distances in km between every point of set 1 (rows) and set 2 (columns).
+
+    All inputs are 1-D radian arrays.
+    """
+    dlat = lat2[np.newaxis, :] - lat1[:, np.newaxis]
+    dlon = lon2[np.newaxis, :] - lon1[:, np.newaxis]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, np.newaxis] * np.cos(lat2)[np.newaxis, :] * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def nearest_indices(lat1, lon1, lat2, lon2):
+    """For every point of set 1, the index of the closest point of set 2 (first index wins ties, like `min()`)."""
+    if len(lat1) == 0:
+        return np.empty(0, dtype=np.intp)
+    chunk = max(1, MAX_MATRIX_CELLS // max(1, len(lat2)))
+    out = np.empty(len(lat1), dtype=np.intp)
+    for start in range(0, len(lat1), chunk):
+        stop = start + chunk
+        out[start:stop] = np.argmin(haversine_matrix(lat1[start:stop], lon1[start:stop], lat2, lon2), axis=1)
+    return out
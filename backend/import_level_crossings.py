@@ -0,0 +1,149 @@
+"""Import railway level crossings from a local OSM extract and cluster them into gates.
+
+Usage:
+    python import_level_crossings.py kerala-latest.osm.pbf [kerala_gates.json]
+
+Accepts OSM XML (.osm, .osm.bz2) or PBF (.osm.pbf, needs the `osmium` package).
+"""
+import bz2
+import json
+import logging
+import os
+import sys
+import xml.etree.ElementTree as ET
+from math import cos, radians
+from gate_registry import make_gate_id
+from route_geometry import haversine
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+# Kerala plus the Nagercoil/Sengottai approaches used by route_junctions.
+KERALA_BBOX = (8.0, 74.8, 12.9, 77.6)  # min_lat, min_lon, max_lat, max_lon
+CLUSTER_THRESHOLD_KM = 0.05  # same radius the app used for clusterCrossings
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kerala_gates.json")
+
+
+def in_bbox(lat, lon, bbox):
+    min_lat, min_lon, max_lat, max_lon = bbox
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+def read_crossings_xml(path, bbox=KERALA_BBOX):
+    """Stream `railway=level_crossing` nodes out of an OSM XML file without loading it whole."""
+    opener = bz2.open if path.endswith(".bz2") else open
+    crossings = []
+    with opener(path, "rb") as f:
+        context = ET.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event != "end" or elem.tag not in ("node", "way", "relation"):
+                continue
+            if elem.tag == "node" and any(tag.get("k") == "railway" and tag.get("v") == "level_crossing"
+                                          for tag in elem.iter("tag")):
+                lat, lon = float(elem.get("lat")), float(elem.get("lon"))
+                if in_bbox(lat, lon, bbox):
+                    crossings.append({"id": int(elem.get("id")), "latitude": lat, "longitude": lon})
+            # Cleared elements stay attached to <osm>; drop them from the root so memory stays flat.
+            root.clear()
+    return crossings
+
+
+def read_crossings_pbf(path, bbox=KERALA_BBOX):
+    import osmium
+
+    crossings = []
+
+    class CrossingHandler(osmium.SimpleHandler):
+        def node(self, n):
+            if n.tags.get("railway") == "level_crossing" and n.location.valid():
+                lat, lon = n.location.lat, n.location.lon
+                if in_bbox(lat, lon, bbox):
+                    crossings.append({"id": n.id, "latitude": lat, "longitude": lon})
+
+    CrossingHandler().apply_file(path)
+    return crossings
+
+
+def read_crossings(path, bbox=KERALA_BBOX):
+    if path.endswith(".pbf"):
+        return read_crossings_pbf(path, bbox)
+    return read_crossings_xml(path, bbox)
+
+
+def cluster_crossings(crossings, threshold_km=CLUSTER_THRESHOLD_KM):
+    """Group crossings closer than `threshold_km` into gates using a spatial-hash grid.
+
+    Each crossing only compares against the 3x3 block of grid cells around it, so
+    the work is near-linear instead of the app's all-pairs loop. Clusters are the
+    connected components of the "within threshold" graph (union-find).
+    """
+    if not crossings:
+        return []
+    # Degrees of longitude shrink towards the pole, so size cells for the highest latitude present;
+    # anywhere else they are merely wider than needed.
+    max_abs_lat = max(abs(c["latitude"]) for c in crossings)
+    cell_lat = threshold_km / 111.32
+    cell_lon = threshold_km / (111.32 * cos(radians(max_abs_lat)))
+
+    parent = list(range(len(crossings)))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    grid = {}
+    for i, c in enumerate(crossings):
+        cell = (int(c["latitude"] // cell_lat), int(c["longitude"] // cell_lon))
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                for j in grid.get((cell[0] + dy, cell[1] + dx), ()):
+                    other = crossings[j]
+                    if haversine(c["latitude"], c["longitude"], other["latitude"], other["longitude"]) < threshold_km:
+                        root_i, root_j = find(i), find(j)
+                        if root_i != root_j:
+                            parent[root_j] = root_i
+        grid.setdefault(cell, []).append(i)
+
+    members = {}
+    for i in range(len(crossings)):
+        members.setdefault(find(i), []).append(crossings[i])
+
+    gates = []
+    for cluster in members.values():
+        avg_lat = sum(c["latitude"] for c in cluster) / len(cluster)
+        avg_lon = sum(c["longitude"] for c in cluster) / len(cluster)
+        node_ids = sorted(c["id"] for c in cluster)
+        gates.append({
+            "gateId": make_gate_id(avg_lat, avg_lon, osm_id=node_ids[0]),
+            "latitude": avg_lat,
+            "longitude": avg_lon,
+            "crossingCenter": {"latitude": avg_lat, "longitude": avg_lon},
+            "nodeCount": len(cluster),
+            "osmNodeIds": node_ids,
+        })
+    # Deterministic order (south to north) so rebuilds diff cleanly.
+    gates.sort(key=lambda g: (g["latitude"], g["longitude"]))
+    return gates
+
+
+def save_gates(gates, filename=DEFAULT_OUTPUT):
+    tmp_path = filename + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(gates, f, ensure_ascii=False)
+    os.replace(tmp_path, filename)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    source = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_OUTPUT
+
+    crossings = read_crossings(source)
+    logging.info(f"Read {len(crossings)} level crossings from {source}")
+    gates = cluster_crossings(crossings)
+    save_gates(gates, output)
+    logging.info(f"Saved {len(gates)} gates to {output}")
@@ -0,0 +1,225 @@
+import logging
+import os
+import socket
+import threading
+import time
+import concurrent.futures
+import metrics
+from scrape_scheduler import PRIORITY_BACKGROUND
+
+
+class JunctionBoardCache:
+    """Process-wide cache of live station boards keyed by junction code.
+
+    Fresh entries are served as-is, entries inside the stale window are served
+    while a background refresh runs, and concurrent misses for the same junction
+    share a single in-flight scrape.
+
+    With a shared `store` (see junction_store.py) the same holds across worker
+    processes: boards are read from the store, and a worker only scrapes a
+    junction while holding that junction's lease.
+
+    Background refreshes of stale entries are queued on `scheduler` (a
+    ScrapeScheduler) at PRIORITY_BACKGROUND, so they share its rate limit and
+    queue bound with every other scrape.
+    """
+
+    def __init__(self, loader, ttl=90, stale_ttl=300, empty_ttl=15, scheduler=None,
+                 store=None, lease_ttl=60, lease_poll=0.25, lease_wait=120):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.empty_ttl = empty_ttl
+        self.scheduler = scheduler
+        self.store = store
+        self.lease_ttl = lease_ttl
+        self.lease_poll = lease_poll
+        self.lease_wait = lease_wait
+        self._owner = f"{socket.gethostname()}:{os.getpid()}:{id(self)}"
+        self._listeners = []
+        self._entries = {}  # code -> (trains, fetched_at)
+        self._inflight = {}  # code -> Future
+        self._lock = threading.Lock()
+
+    def _ttl_for(self, trains):
+        # An empty board is as likely to be a failed scrape as a quiet junction.
+        return self.ttl if trains else min(self.ttl, self.empty_ttl)
+
+    def _start_load_locked(self, code):
+        future = self._inflight.get(code)
+        if future is not None:
+            return future, False
+        future = concurrent.futures.Future()
+        self._inflight[code] = future
+        return future, True
+
+    def _renew_lease(self, code, done):
+        """Keep our lease on `code` alive until `done` is set, however long the scrape's retries take."""
+        while not done.wait(self.lease_ttl / 3):
+            if not self.store.renew_lease(code, self._owner, self.lease_ttl):
+                logging.warning(f"Lost the scrape lease for {code}; another worker may scrape it too")
+                return
+
+    def _fetch_shared(self, code, max_age):
+        """Scrape under the junction's lease, or wait (up to lease_wait seconds) for the worker holding it."""
+        started = time.time()
+        while True:
+            if self.store.acquire_lease(code, self._owner, self.lease_ttl):
+                done = threading.Event()
+                renewer = threading.Thread(target=self._renew_lease, args=(code, done),
+                                           name=f"junction-lease-{code}", daemon=True)
+                renewer.start()
+                try:
+                    entry = self.store.read(code)
+                    if entry and time.time() - entry[1] < max_age:
+                        logging.info(f"Junction {code} was refreshed by another worker")
+                        return entry
+                    trains = self.loader(code)
+                    fetched_at = time.time()
+                    if trains is not None:
+                        self.store.write(code, trains, fetched_at)
+                    return trains, fetched_at
+                finally:
+                    done.set()
+                    renewer.join()
+                    self.store.release_lease(code, self._owner)
+            time.sleep(self.lease_poll)
+            entry = self.store.read(code)
+            if entry and entry[1] >= started:
+                return entry
+            if time.time() - started > self.lease_wait:
+                if entry:
+                    logging.warning(f"Gave up waiting for another worker's scrape of {code}, serving its last board")
+                    return entry
+                raise TimeoutError(f"Another worker has held the {code} scrape lease for over {self.lease_wait}s")
+
+    def _fail(self, code, future, e):
+        logging.error(f"Junction cache load failed for {code}: {e}")
+        with self._lock:
+            self._inflight.pop(code, None)
+        future.set_exception(e)
+
+    def _load(self, code, future, max_age=0):
+        try:
+            if self.store is not None:
+                trains, fetched_at = self._fetch_shared(code, max_age)
+            else:
+                trains, fetched_at = self.loader(code), time.time()
+        except Exception as e:
+            self._fail(code, future, e)
+            return
+        with self._lock:
+            self._inflight.pop(code, None)
+            if trains is not None:
+                self._entries[code] = (trains, fetched_at)
+        future.set_result(trains)
+        if trains is not None:
+            for listener in self._listeners:
+                try:
+                    listener(code, trains)
+                except Exception as e:
+                    logging.error(f"Junction board listener failed for {code}: {e}")
+
+    def subscribe(self, listener):
+        """Call `listener(code, trains)` after every successful load, on the loading thread."""
+        self._listeners.append(listener)
+
+    def _adopt_shared(self, code):
+        """Take a newer board for `code` from the shared store if ours isn't fresh; the read runs outside the lock."""
+        if self.store is None:
+            return
+        entry = self._entries.get(code)
+        if entry and time.time() - entry[1] < self._ttl_for(entry[0]):
+            return
+        # Another worker may have scraped it since we last looked.
+        shared = self.store.read(code)
+        if shared:
+            with self._lock:
+                current = self._entries.get(code)
+                if not current or shared[1] > current[1]:
+                    self._entries[code] = shared
+
+    def _refresh_in_background(self, code, future):
+        """Run the load behind `future` as a background scrape job; call without holding the lock."""
+        if self.scheduler is None:
+            threading.Thread(target=self._load, args=(code, future, self.ttl),
+                             name=f"junction-refresh-{code}", daemon=True).start()
+            return
+        job = self.scheduler.submit(code, self._load, PRIORITY_BACKGROUND, code, future, self.ttl)
+
+        def dropped(job):
+            # A job the scheduler rejected or evicted never ran _load; release its waiters.
+            e = job.exception() if not job.cancelled() else concurrent.futures.CancelledError()
+            if e is not None and not future.done():
+                self._fail(code, future, e)
+        job.add_done_callback(dropped)
+
+    def _cached_locked(self, code):
+        """(usable board or None, refresh Future the caller must start via _refresh_in_background or None)."""
+        entry = self._entries.get(code)
+        if not entry:
+            return None, None
+        trains, fetched_at = entry
+        age = time.time() - fetched_at
+        if age < self._ttl_for(trains):
+            logging.debug(f"Junction cache hit for {code} ({age:.0f}s old)")
+            metrics.CACHE_LOOKUPS.labels("hit").inc()
+            return trains, None
+        if age < self._ttl_for(trains) + self.stale_ttl:
+            future, leader = self._start_load_locked(code)
+            if leader:
+                logging.info(f"Serving stale board for {code} ({age:.0f}s old), refreshing in background")
+            metrics.CACHE_LOOKUPS.labels("stale").inc()
+            return trains, future if leader else None
+        return None, None
+
+    def get_cached(self, code):
+        """Return a fresh or stale-but-usable board without scraping, or None if a scrape is needed.
+
+        With a shared store this may read it, so call it off the event loop.
+        """
+        self._adopt_shared(code)
+        with self._lock:
+            trains, refresh = self._cached_locked(code)
+        if refresh is not None:
+            self._refresh_in_background(code, refresh)
+        return trains
+
+    def get(self, code):
+        """Return the board for `code`, scraping at most once across concurrent callers."""
+        self._adopt_shared(code)
+        with self._lock:
+            trains, refresh = self._cached_locked(code)
+            if trains is None:
+                future, leader = self._start_load_locked(code)
+        if trains is not None:
+            if refresh is not None:
+                self._refresh_in_background(code, refresh)
+            return trains
+
+        if leader:
+            logging.info(f"Junction cache miss for {code}, scraping")
+            metrics.CACHE_LOOKUPS.labels("miss").inc()
+            self._load(code, future, self.ttl)
+        else:
+            logging.info(f"Joining in-flight scrape for {code}")
+            metrics.CACHE_LOOKUPS.labels("coalesced").inc()
+        return future.result()
+
+    def refresh(self, code, max_age=0):
+        """Scrape `code` now unless a worker sharing the store did within `max_age` seconds, joining a scrape already in flight."""
+        with self._lock:
+            future, leader = self._start_load_locked(code)
+        if leader:
+            self._load(code, future, max_age)
+        return future.result()
+
+    def peek(self, code):
+        """Return the cached board for `code` without scraping, or None if nothing is cached."""
+        entry = self._entries.get(code)
+        return entry[0] if entry else None
+
+    def age(self, code):
+        """Seconds since `code` was last scraped, or None if it has never been cached."""
+        entry = self._entries.get(code)
+        return time.time() - entry[1] if entry else None
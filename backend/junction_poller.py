@@ -0,0 +1,80 @@
+import logging
+import threading
+import time
+from scrape_scheduler import PRIORITY_BACKGROUND
+
+
+class JunctionPoller:
+    """Background scheduler that keeps every known junction board fresh in the shared cache.
+
+    Once running, the request path joins against the polled snapshot and only
+    scrapes inline for junctions the poller has never seen.
+    """
+
+    def __init__(self, cache, scheduler, interval=60):
+        self.cache = cache
+        self.scheduler = scheduler
+        self.interval = interval
+        self.junction_codes = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, junction_codes):
+        if self.running:
+            return
+        self.junction_codes = list(junction_codes)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="junction-poller", daemon=True)
+        self._thread.start()
+        logging.info(f"Junction poller started for {self.junction_codes} every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def poll_once(self):
+        """Refresh every junction concurrently and wait for all of them."""
+        # Workers sharing a junction store take turns: skip boards another worker polled this cycle.
+        futures = {code: self.scheduler.submit(code, self.cache.refresh, PRIORITY_BACKGROUND, code, self.interval / 2)
+                   for code in self.junction_codes}
+        for code, future in futures.items():
+            try:
+                trains = future.result()
+                count = len(trains) if trains is not None else "no browser"
+                logging.info(f"Polled junction {code}: {count} trains")
+            except Exception as e:
+                logging.error(f"Polling junction {code} failed: {e}")
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.time()
+            self.poll_once()
+            elapsed = time.time() - started
+            self._stop.wait(max(0, self.interval - elapsed))
+
+    def board_nowait(self, code):
+        """Board for `code` if it can be served without scraping, else None."""
+        if self.running:
+            trains = self.cache.peek(code)
+            if trains is not None:
+                return trains
+        return self.cache.get_cached(code)
+
+    def board(self, code):
+        """Board for `code` from the snapshot, scraping inline only if it was never polled."""
+        if self.running:
+            trains = self.cache.peek(code)
+            if trains is not None:
+                return trains
+        return self.cache.get(code)
+
+    def snapshot_ages(self):
+        """Age in seconds of each polled junction board (None if not yet scraped)."""
+        ages = {}
+        for code in self.junction_codes:
+            age = self.cache.age(code)
+            ages[code] = round(age, 1) if age is not None else None
+        return ages
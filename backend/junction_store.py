@@ -0,0 +1,112 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+
+class SqliteBoardStore:
+    """Junction boards and per-junction scrape leases in a SQLite file shared by every worker on the host."""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS boards (code TEXT PRIMARY KEY, trains TEXT NOT NULL, fetched_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (code TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; each statement is its own transaction.
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def read(self, code):
+        row = self._conn().execute("SELECT trains, fetched_at FROM boards WHERE code = ?", (code,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def write(self, code, trains, fetched_at):
+        self._conn().execute(
+            "INSERT OR REPLACE INTO boards (code, trains, fetched_at) VALUES (?, ?, ?)",
+            (code, json.dumps(trains), fetched_at)
+        )
+
+    def acquire_lease(self, code, owner, ttl):
+        """Take the scrape lease for `code` if it is free, expired or already ours."""
+        now = time.time()
+        cursor = self._conn().execute(
+            "INSERT INTO leases (code, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(code) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at < ? OR leases.owner = excluded.owner",
+            (code, owner, now + ttl, now)
+        )
+        return cursor.rowcount == 1
+
+    def renew_lease(self, code, owner, ttl):
+        """Push back the expiry of a lease we hold; False if it expired and someone else took it."""
+        cursor = self._conn().execute(
+            "UPDATE leases SET expires_at = ? WHERE code = ? AND owner = ?", (time.time() + ttl, code, owner)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, code, owner):
+        self._conn().execute("DELETE FROM leases WHERE code = ? AND owner = ?", (code, owner))
+
+
+class RedisBoardStore:
+    """Same contract as SqliteBoardStore on a Redis-compatible server, for workers spread over several hosts."""
+
+    # Delete the lease only if we still hold it, so an expired lease taken over by another worker survives.
+    RELEASE_SCRIPT = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+    RENEW_SCRIPT = (
+        "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('pexpire', KEYS[1], ARGV[2]) end return 0"
+    )
+
+    def __init__(self, url, prefix="rgt:junction:"):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+        self._renew = self.client.register_script(self.RENEW_SCRIPT)
+
+    def read(self, code):
+        raw = self.client.get(f"{self.prefix}board:{code}")
+        if raw is None:
+            return None
+        entry = json.loads(raw)
+        return entry["trains"], entry["fetched_at"]
+
+    def write(self, code, trains, fetched_at):
+        self.client.set(f"{self.prefix}board:{code}", json.dumps({"trains": trains, "fetched_at": fetched_at}))
+
+    def acquire_lease(self, code, owner, ttl):
+        key = f"{self.prefix}lease:{code}"
+        if self.client.set(key, owner, nx=True, px=int(ttl * 1000)):
+            return True
+        held_by = self.client.get(key)
+        return held_by is not None and held_by.decode() == owner
+
+    def renew_lease(self, code, owner, ttl):
+        return bool(self._renew(keys=[f"{self.prefix}lease:{code}"], args=[owner, int(ttl * 1000)]))
+
+    def release_lease(self, code, owner):
+        self._release(keys=[f"{self.prefix}lease:{code}"], args=[owner])
+
+
+def open_board_store(url):
+    """Store for an RGT_JUNCTION_STORE value: "sqlite:///path/to/file.db", "redis://host:port/db", or "" for none."""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "sqlite":
+        path = url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite:"):]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SqliteBoardStore(path)
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBoardStore(url)
+    raise ValueError(f"Unsupported junction store URL: {url}")
@@ -0,0 +1,107 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from pprint import pformat
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+LOG_QUEUE_SIZE = int(os.getenv("RGT_LOG_QUEUE_SIZE", "10000"))
+# Payload dumps: at most this many items per list/dict level and characters overall, for this share of requests.
+LOG_PAYLOAD_MAX_ITEMS = int(os.getenv("RGT_LOG_PAYLOAD_MAX_ITEMS", "10"))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("RGT_LOG_PAYLOAD_MAX_CHARS", "4000"))
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("RGT_LOG_PAYLOAD_SAMPLE_RATE", "1.0"))
+
+_listener = None
+
+
+class Deferred:
+    """Log argument rendered by str() only when a handler emits it.
+
+    Subclasses must hold a snapshot that nobody mutates afterwards, since rendering
+    happens later on the log listener thread.
+    """
+
+    def render(self):
+        raise NotImplementedError
+
+    def __str__(self):
+        return self.render()
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves records whose arguments are all Deferred unformatted.
+
+    The stock handler formats every record on the calling thread; here those records
+    are rendered by the listener thread instead, off the request path.
+    """
+
+    def prepare(self, record):
+        args = record.args if isinstance(record.args, tuple) else ()
+        if args and not record.exc_info and all(isinstance(arg, Deferred) for arg in args):
+            return record
+        return super().prepare(record)
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging; drop the record instead.
+            pass
+
+
+def configure_logging(log_file, level=logging.INFO):
+    """Route the root logger through a bounded queue to file and console handlers on a background thread.
+
+    Like logging.basicConfig, only the first call in a process takes effect.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.FileHandler(log_file), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(DeferredQueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+
+def summarize(value, max_items=LOG_PAYLOAD_MAX_ITEMS):
+    """Shrink nested lists/dicts to their first `max_items` entries, noting how many were dropped."""
+    if isinstance(value, dict):
+        items = list(value.items())
+        out = {key: summarize(item, max_items) for key, item in items[:max_items]}
+        if len(items) > max_items:
+            out["..."] = f"{len(items) - max_items} more keys"
+        return out
+    if isinstance(value, (list, tuple)):
+        out = [summarize(item, max_items) for item in value[:max_items]]
+        if len(value) > max_items:
+            out.append(f"... {len(value) - max_items} more items")
+        return out
+    return value
+
+
+class Payload(Deferred):
+    """A request/response body, summarized and pretty-printed only if the record is emitted."""
+
+    def __init__(self, value):
+        # Summarizing copies the structure, so later mutation of the payload can't leak into the log.
+        self.value = summarize(value)
+
+    def render(self):
+        text = pformat(self.value, indent=2)
+        if len(text) > LOG_PAYLOAD_MAX_CHARS:
+            return f"{text[:LOG_PAYLOAD_MAX_CHARS]}... ({len(text)} chars, truncated)"
+        return text
+
+
+def sample_payload():
+    """Whether this request's payload should be dumped, per RGT_LOG_PAYLOAD_SAMPLE_RATE."""
+    return LOG_PAYLOAD_SAMPLE_RATE >= 1.0 or random.random() < LOG_PAYLOAD_SAMPLE_RATE
@@ -0,0 +1,73 @@
+import logging
+import time
+from contextlib import contextmanager
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+
+# Sub-millisecond geometry up to multi-second Selenium scrapes.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40)
+
+STAGE_SECONDS = Histogram(
+    "rgt_stage_seconds", "Latency of request pipeline stages", ["stage"], buckets=LATENCY_BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "rgt_request_seconds", "Time to build each HTTP response (headers only for streamed bodies)",
+    ["endpoint", "status"], buckets=LATENCY_BUCKETS
+)
+SCRAPE_SECONDS = Histogram(
+    "rgt_junction_scrape_seconds", "Latency of one junction board scrape", ["junction", "backend"],
+    buckets=LATENCY_BUCKETS
+)
+SCRAPE_FAILURES = Counter(
+    "rgt_scrape_failures_total", "Junction scrapes that raised or returned no board", ["junction", "backend"]
+)
+WAIT_RETRIES = Counter(
+    "rgt_wait_for_element_retries_total", "Failed wait_for_element attempts", ["element"]
+)
+CACHE_LOOKUPS = Counter(
+    "rgt_junction_cache_lookups_total", "Junction board cache lookups by outcome (hit, stale, miss, coalesced)",
+    ["result"]
+)
+
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "rgt_response_cache_lookups_total", "/railway_data response cache lookups by outcome (hit, miss, coalesced)",
+    ["result"]
+)
+SCRAPE_QUEUE_DEPTH = Gauge(
+    "rgt_scrape_queue_depth", "Junction scrape jobs waiting in the scheduler queue"
+)
+SCRAPE_REJECTIONS = Counter(
+    "rgt_scrape_rejections_total", "Scrape jobs refused by the scheduler by reason (queue_full, backoff)",
+    ["reason"]
+)
+
+
+@contextmanager
+def span(stage):
+    """Time a block (or, as a decorator, a function) into rgt_stage_seconds{stage=...}."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        logging.debug("span stage=%s ms=%.2f", stage, elapsed * 1000)
+
+
+@contextmanager
+def scrape_span(junction, backend):
+    """Time one scrape attempt; an exception counts as a failure and propagates."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        SCRAPE_FAILURES.labels(junction, backend).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SCRAPE_SECONDS.labels(junction, backend).observe(elapsed)
+        logging.debug("span stage=scrape junction=%s backend=%s ms=%.2f", junction, backend, elapsed * 1000)
+
+
+def render():
+    """Current metrics in the Prometheus text exposition format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
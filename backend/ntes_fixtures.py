@@ -0,0 +1,87 @@
+import logging
+import os
+import re
+from datetime import datetime
+from ntes_http import parse_station_board
+
+# First line of every fixture file, so replays can move the board's times up to "now".
+RECORDED_AT_PREFIX = "<!-- recorded_at: "
+TIME_PATTERN = re.compile(r'\b(\d{2}):(\d{2})\b')
+
+
+def fixture_path(directory, station_code):
+    return os.path.join(directory, f"{station_code}.html")
+
+
+def save_fixture(directory, station_code, page_html, recorded_at=None):
+    """Write a Live Station results page as `<code>.html`, stamped with when it was recorded."""
+    recorded_at = recorded_at or datetime.now()
+    os.makedirs(directory, exist_ok=True)
+    path = fixture_path(directory, station_code)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f"{RECORDED_AT_PREFIX}{recorded_at.isoformat(timespec='minutes')} -->\n")
+        f.write(page_html)
+    return path
+
+
+def record_fixture(client, directory, station_code):
+    """Fetch a live board with an NtesHttpClient and save it as a fixture."""
+    return save_fixture(directory, station_code, client.fetch_live_station(station_code))
+
+
+def render_station_board(rows):
+    """Minimal Live Station results page for (train_text, arrival_text, departure_text) rows."""
+    body = "".join(
+        f"<tr><td>{i}</td><td>{train}</td><td>{arrival.replace(chr(10), '<br>')}</td>"
+        f"<td>{departure.replace(chr(10), '<br>')}</td><td>-</td></tr>"
+        for i, (train, arrival, departure) in enumerate(rows, 1)
+    )
+    return (
+        "<html><body><table class='w3-table'><tbody>"
+        "<tr><td>#</td><td>Train</td><td>Arrival</td><td>Departure</td><td>PF</td></tr>"
+        f"{body}</tbody></table></body></html>"
+    )
+
+
+def shift_times(text, minutes):
+    """Move every HH:MM in `text` by `minutes`, wrapping around midnight."""
+    def shift(match):
+        total = (int(match.group(1)) * 60 + int(match.group(2)) + minutes) % (24 * 60)
+        return f"{total // 60:02d}:{total % 60:02d}"
+    return TIME_PATTERN.sub(shift, text)
+
+
+class FixtureBoardSource:
+    """Serves recorded station boards from disk in place of NTES, with times replayed relative to now."""
+
+    def __init__(self, directory, shift_to_now=True):
+        self.directory = directory
+        self.shift_to_now = shift_to_now
+        self._pages = {}
+
+    def _load(self, station_code):
+        if station_code not in self._pages:
+            path = fixture_path(self.directory, station_code)
+            if not os.path.exists(path):
+                raise Exception(f"No recorded board for {station_code} in {self.directory}")
+            with open(path, "r", encoding="utf-8") as f:
+                page_html = f.read()
+            recorded_at = None
+            if page_html.startswith(RECORDED_AT_PREFIX):
+                stamp, _, page_html = page_html[len(RECORDED_AT_PREFIX):].partition(" -->\n")
+                recorded_at = datetime.fromisoformat(stamp)
+            self._pages[station_code] = (page_html, recorded_at)
+        return self._pages[station_code]
+
+    def get_board_rows(self, station_code):
+        page_html, recorded_at = self._load(station_code)
+        rows = parse_station_board(page_html)
+        if rows is None:
+            raise Exception(f"Results table not found in fixture for {station_code}")
+        if self.shift_to_now and recorded_at:
+            now = datetime.now()
+            offset = (now.hour * 60 + now.minute) - (recorded_at.hour * 60 + recorded_at.minute)
+            rows = [(train, shift_times(arrival, offset), shift_times(departure, offset))
+                    for train, arrival, departure in rows]
+        logging.info(f"Replayed {len(rows)} trains at {station_code} from fixture")
+        return rows
@@ -0,0 +1,96 @@
+import logging
+from urllib.parse import urljoin
+import requests
+from requests.adapters import HTTPAdapter
+from lxml import html
+
+USER_AGENT = (
+    "Mozilla/5.0 (Linux; Android 10) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/124.0 Mobile Safari/537.36"
+)
+
+
+# Stands in for <br> while source whitespace, newlines included, is collapsed (a private-use code point).
+_LINE_BREAK = "\ue000"
+
+
+def _cell_text(cell):
+    """Render a table cell the way Selenium's `.text` does: <br> becomes a newline, other whitespace collapses."""
+    for br in cell.iter("br"):
+        br.tail = _LINE_BREAK + (br.tail or "")
+    lines = (" ".join(line.split()) for line in cell.text_content().split(_LINE_BREAK))
+    return "\n".join(line for line in lines if line)
+
+
+def parse_station_board(page_html):
+    """Extract (train_text, arrival_text, departure_text) rows from a Live Station results page."""
+    doc = html.fromstring(page_html)
+    tables = doc.xpath("//table[contains(@class, 'w3-table')]")
+    if not tables:
+        return None
+    rows = []
+    # lxml keeps the markup as sent: rows sit under <tbody> only if the server wrote one (browsers always add it).
+    for row in tables[0].xpath("./tbody/tr | ./tr")[1:]:
+        cols = row.xpath("./td")
+        if len(cols) >= 5:
+            rows.append((_cell_text(cols[1]), _cell_text(cols[2]), _cell_text(cols[3])))
+    return rows
+
+
+class NtesHttpClient:
+    """Browserless Live Station client that replays the form submission over a pooled HTTP session."""
+
+    def __init__(self, base_url, pool_size=4, timeout=20):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"User-Agent": USER_AGENT})
+
+    def _live_station_form(self):
+        """Load the Live Station page for its session cookies, form action, hidden fields and station field name."""
+        page_url = urljoin(self.base_url, "liveStation")
+        response = self.session.get(page_url, timeout=self.timeout)
+        response.raise_for_status()
+        doc = html.fromstring(response.text)
+        forms = doc.xpath("//form[.//input[@id='jFromStationInput']]")
+        if not forms:
+            raise Exception("Live Station form not found")
+        form = forms[0]
+        action = urljoin(page_url, form.get("action") or page_url)
+        method = (form.get("method") or "post").lower()
+        fields = {}
+        for field in form.xpath(".//input[@name]"):
+            field_type = (field.get("type") or "text").lower()
+            if field_type in ("radio", "checkbox") and field.get("checked") is None:
+                continue
+            if field_type in ("submit", "button", "image"):
+                continue
+            fields[field.get("name")] = field.get("value") or ""
+        station_field = form.xpath(".//input[@id='jFromStationInput']")[0].get("name") or "jFromStationInput"
+        return action, method, fields, station_field
+
+    def fetch_live_station(self, station_code):
+        """Submit the Live Station form for `station_code` (2-hour window) and return the result HTML."""
+        action, method, fields, station_field = self._live_station_form()
+        fields[station_field] = station_code
+        fields["nHr"] = "2"
+        logging.info(f"Submitting Live Station form over HTTP for {station_code}")
+        if method == "get":
+            response = self.session.get(action, params=fields, timeout=self.timeout)
+        else:
+            response = self.session.post(action, data=fields, timeout=self.timeout)
+        response.raise_for_status()
+        return response.text
+
+    def get_board_rows(self, station_code):
+        rows = parse_station_board(self.fetch_live_station(station_code))
+        if rows is None:
+            raise Exception(f"Results table not found in HTTP response for {station_code}")
+        logging.info(f"Found {len(rows)} trains at {station_code} over HTTP")
+        return rows
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,85 @@
+import asyncio
+import json
+import time
+from collections import OrderedDict
+import metrics
+
+
+def canonical_request_key(data):
+    """Order-independent key for a /railway_data body, or None if the body isn't shaped for one.
+
+    Gates are identified by their registry ID, or coordinates quantized to ~10 m
+    like make_gate_id, paired with the client's gate number. Route coordinates are
+    left out: assignments for known gates come from the registry regardless.
+    """
+    try:
+        gates = tuple(sorted(
+            (str(gate['gateNumber']),
+             gate.get('gateId') or "{:.4f},{:.4f}".format(
+                 gate.get('crossingCenter', {}).get('latitude', gate['latitude']),
+                 gate.get('crossingCenter', {}).get('longitude', gate['longitude'])))
+            for gate in data.get('gates', [])
+        ))
+        gate_ids = tuple(sorted(str(gate_id) for gate_id in data.get('gateIds', [])))
+        return gates, gate_ids, str(data.get('selectedGateId'))
+    except (AttributeError, KeyError, TypeError, ValueError):
+        return None
+
+
+class ResponseCache:
+    """Short-lived LRU of assembled responses, with identical concurrent requests sharing one computation.
+
+    Entries live until the end of their `ttl`-second time bucket, so every client
+    sees results refresh at the same boundaries. The cache is bounded both by entry
+    count and by the serialized size of the cached responses.
+    """
+
+    def __init__(self, ttl=10, max_entries=256, max_bytes=32 * 1024 * 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # (bucket, key) -> (value, size)
+        self._bytes = 0
+        self._inflight = {}  # (bucket, key) -> asyncio.Task
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, size) = self._entries.popitem(last=False)
+            self._bytes -= size
+
+    def _store(self, slot, value):
+        size = len(json.dumps(value))
+        if size > self.max_bytes:
+            return
+        # Entries from earlier buckets can never be hit again.
+        for stale in [s for s in self._entries if s[0] < slot[0]]:
+            self._bytes -= self._entries.pop(stale)[1]
+        self._entries[slot] = (value, size)
+        self._bytes += size
+        self._evict()
+
+    async def get_or_compute(self, key, compute):
+        """Cached value for `key` in the current bucket, else the result of awaiting `compute()` once."""
+        slot = (int(time.time() // self.ttl), key)
+        entry = self._entries.get(slot)
+        if entry is not None:
+            self._entries.move_to_end(slot)
+            metrics.RESPONSE_CACHE_LOOKUPS.labels("hit").inc()
+            return entry[0]
+        task = self._inflight.get(slot)
+        if task is not None:
+            metrics.RESPONSE_CACHE_LOOKUPS.labels("coalesced").inc()
+            return await asyncio.shield(task)
+
+        metrics.RESPONSE_CACHE_LOOKUPS.labels("miss").inc()
+        # Its own task, so a disconnecting first caller can't cancel the computation the others joined.
+        task = asyncio.ensure_future(compute())
+        self._inflight[slot] = task
+        task.add_done_callback(lambda done: self._finish(slot, done))
+        return await asyncio.shield(task)
+
+    def _finish(self, slot, task):
+        if self._inflight.get(slot) is task:
+            del self._inflight[slot]
+        if not task.cancelled() and task.exception() is None:
+            self._store(slot, task.result())
@@ -0,0 +1,51 @@
+from math import radians, sin, cos, sqrt, atan2
+
+EARTH_RADIUS_KM = 6371
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    dlat = radians(lat2 - lat1)
+    dlon = radians(lon2 - lon1)
+    a = sin(dlat / 2)**2 + cos(radians(lat1)) * cos(radians(lat2)) * sin(dlon / 2)**2
+    return EARTH_RADIUS_KM * 2 * atan2(sqrt(a), sqrt(1 - a))
+
+
+class RouteGeometry:
+    """A route's station sequence as a polyline with cumulative chainage (km from the first station)."""
+
+    def __init__(self, points):
+        self.points = list(points)
+        self.chainage = [0.0]
+        for (lat1, lon1), (lat2, lon2) in zip(self.points, self.points[1:]):
+            self.chainage.append(self.chainage[-1] + haversine(lat1, lon1, lat2, lon2))
+        self.length = self.chainage[-1]
+
+    def locate(self, lat, lon):
+        """Chainage in km of the point's projection onto the polyline.
+
+        Points before the first station get a negative chainage and points past the
+        last one extend beyond `length`, so off-route junctions still order correctly.
+        """
+        if len(self.points) < 2:
+            return 0.0
+        # Project in a local equirectangular plane; segments between stations are only a few km.
+        kx = cos(radians(lat))
+        best = None
+        for i, ((lat1, lon1), (lat2, lon2)) in enumerate(zip(self.points, self.points[1:])):
+            ax, ay = (lon1 - lon) * kx, lat1 - lat
+            bx, by = (lon2 - lon) * kx, lat2 - lat
+            dx, dy = bx - ax, by - ay
+            seg_sq = dx * dx + dy * dy
+            t = -(ax * dx + ay * dy) / seg_sq if seg_sq > 0 else 0.0
+            clamped = min(1.0, max(0.0, t))
+            px, py = ax + clamped * dx, ay + clamped * dy
+            dist_sq = px * px + py * py
+            if best is None or dist_sq < best[0]:
+                best = (dist_sq, i, t, clamped)
+
+        _, i, t, clamped = best
+        if i == 0 and t < 0:
+            return -haversine(lat, lon, *self.points[0])
+        if i == len(self.points) - 2 and t > 1:
+            return self.length + haversine(lat, lon, *self.points[-1])
+        return self.chainage[i] + clamped * (self.chainage[i + 1] - self.chainage[i])
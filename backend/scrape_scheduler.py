@@ -0,0 +1,172 @@
+import concurrent.futures
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+import metrics
+from rate_limit import TokenBucket
+
+# Lower runs first.
+PRIORITY_SELECTED = 0  # junctions of a user's selected gate
+PRIORITY_REQUEST = 1  # junctions some request is waiting on
+PRIORITY_BACKGROUND = 2  # poller refreshes
+
+
+class SchedulerFull(Exception):
+    """The scrape queue is at its depth limit and this job ranked below everything queued."""
+
+
+class JunctionBackoff(Exception):
+    """The junction failed recently and is still inside its backoff window."""
+
+
+def backoff_delay(attempt, base, cap):
+    """Jittered exponential backoff: up to base * 2**attempt seconds (capped), at least half of it."""
+    delay = min(cap, base * (2 ** attempt))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class ScrapeScheduler:
+    """Priority queue of junction scrape jobs run by a fixed set of worker threads.
+
+    Jobs for the same junction and call are merged; every extra submitter raises
+    the job's demand, and among equal priorities the most demanded job runs first.
+    The queue is bounded: a new job that ranks below everything queued is rejected,
+    otherwise the lowest-ranked queued job is dropped to make room.
+
+    guard() wraps the actual scrape with a global NTES rate limit and per-junction
+    jittered exponential backoff, so a failing junction fails fast instead of
+    tying up workers.
+    """
+
+    def __init__(self, workers=2, rate=1.0, burst=3, max_queue=32, backoff_base=5, backoff_max=300):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate, burst)
+        self._heap = []
+        self._jobs = {}  # key -> job dict
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self._failures = {}  # code -> (consecutive failures, retry not before)
+        self._failures_lock = threading.Lock()
+
+    def _rank(self, job):
+        return (job["priority"], -job["demand"], job["seq"])
+
+    def _push_locked(self, job):
+        job["version"] += 1
+        heapq.heappush(self._heap, (self._rank(job), job["version"], job["key"]))
+        self._cond.notify()
+
+    def _ensure_workers_locked(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, name=f"junction-scrape-{len(self._threads)}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def submit(self, code, fn, priority=PRIORITY_REQUEST, *args):
+        """Queue `fn(*args)` as a scrape job for `code`; returns a Future shared by identical submissions."""
+        key = (code, fn, args)
+        with self._cond:
+            self._ensure_workers_locked()
+            job = self._jobs.get(key)
+            if job is not None:
+                job["demand"] += 1
+                job["priority"] = min(job["priority"], priority)
+                self._push_locked(job)
+                return job["future"]
+
+            job = {"key": key, "code": code, "fn": fn, "args": args, "priority": priority, "demand": 1,
+                   "seq": next(self._seq), "version": 0, "future": concurrent.futures.Future()}
+            if len(self._jobs) >= self.max_queue:
+                worst = max(self._jobs.values(), key=self._rank)
+                if self._rank(worst) < self._rank(job):
+                    metrics.SCRAPE_REJECTIONS.labels("queue_full").inc()
+                    job["future"].set_exception(SchedulerFull(f"Scrape queue full, dropped {code}"))
+                    return job["future"]
+                del self._jobs[worst["key"]]
+                metrics.SCRAPE_REJECTIONS.labels("queue_full").inc()
+                worst["future"].set_exception(SchedulerFull(f"Scrape queue full, dropped {worst['code']}"))
+            self._jobs[key] = job
+            metrics.SCRAPE_QUEUE_DEPTH.set(len(self._jobs))
+            self._push_locked(job)
+            return job["future"]
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                while not self._heap and not self._stopped:
+                    self._cond.wait()
+                if self._stopped:
+                    return None
+                _, version, key = heapq.heappop(self._heap)
+                job = self._jobs.get(key)
+                if job is None or job["version"] != version:
+                    continue  # superseded by a re-prioritized entry, or dropped
+                del self._jobs[key]
+                metrics.SCRAPE_QUEUE_DEPTH.set(len(self._jobs))
+                return job
+
+    def _run(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            if not job["future"].set_running_or_notify_cancel():
+                continue
+            try:
+                job["future"].set_result(job["fn"](*job["args"]))
+            except BaseException as e:
+                job["future"].set_exception(e)
+
+    def guard(self, loader):
+        """Wrap a junction loader with the global rate limit and per-junction backoff."""
+        def guarded(code):
+            with self._failures_lock:
+                failures, retry_at = self._failures.get(code, (0, 0))
+            wait = retry_at - time.time()
+            if wait > 0:
+                metrics.SCRAPE_REJECTIONS.labels("backoff").inc()
+                raise JunctionBackoff(f"{code} is backing off for another {wait:.0f}s after {failures} failures")
+            self.bucket.acquire()
+            try:
+                trains = loader(code)
+            except Exception:
+                self._record_failure(code)
+                raise
+            if trains is None:
+                self._record_failure(code)
+            else:
+                with self._failures_lock:
+                    self._failures.pop(code, None)
+            return trains
+        return guarded
+
+    def _record_failure(self, code):
+        with self._failures_lock:
+            failures = self._failures.get(code, (0, 0))[0] + 1
+            delay = backoff_delay(failures - 1, self.backoff_base, self.backoff_max)
+            self._failures[code] = (failures, time.time() + delay)
+        logging.warning(f"Scrape of {code} failed {failures} time(s) in a row, backing off {delay:.0f}s")
+
+    def snapshot(self):
+        """Queued jobs and junctions currently backing off, for diagnostics."""
+        now = time.time()
+        with self._cond:
+            queued = [{"junction": job["code"], "priority": job["priority"], "demand": job["demand"]}
+                      for job in sorted(self._jobs.values(), key=self._rank)]
+        with self._failures_lock:
+            backoff = {code: {"failures": failures, "retry_in": round(max(0, retry_at - now), 1)}
+                       for code, (failures, retry_at) in self._failures.items()}
+        return {"queued": queued, "backoff": backoff}
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
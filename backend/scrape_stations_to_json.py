@@ -1,9 +1,11 @@
 import json
 import logging
 import os
-from dotenv import load_dotenv
-import googlemaps
+import threading
 import time
+import concurrent.futures
+from dotenv import load_dotenv
+from rate_limit import TokenBucket
 
 logging.basicConfig(level=logging.DEBUG)
 load_dotenv()
@@ -165,52 +167,168 @@ stations_data = [
     {"station_name": "Nilambur Road", "station_code": "NIL", "route": "Shornur to Nilambur"}
 ]
 
-def geocode_stations(stations, google_maps_api_key):
+GEOCODE_CACHE_PATH = os.getenv(
+    "RGT_GEOCODE_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocode_cache.jsonl")
+)
+GEOCODE_WORKERS = int(os.getenv("RGT_GEOCODE_WORKERS", "8"))
+GEOCODE_RATE = float(os.getenv("RGT_GEOCODE_RATE", "10"))  # requests per second, shared by all workers
+# A query that found nothing is retried on builds started this long after the failed lookup.
+GEOCODE_MISS_TTL = float(os.getenv("RGT_GEOCODE_MISS_TTL", str(24 * 3600)))
+
+class GoogleGeocoder:
+    """Google Maps Geocoding API client. Any object with the same geocode(query) method can stand in for it."""
+
+    def __init__(self, api_key):
+        import googlemaps
+
+        self.client = googlemaps.Client(key=api_key)
+
+    def geocode(self, query):
+        """(lat, lon) of the best match for `query`, or None."""
+        result = self.client.geocode(query)
+        if not result:
+            return None
+        location = result[0]['geometry']['location']
+        return location['lat'], location['lng']
+
+class StaticGeocoder:
+    """Offline stand-in that answers from a {query: (lat, lon)} mapping."""
+
+    def __init__(self, locations):
+        self.locations = dict(locations)
+
+    def geocode(self, query):
+        return self.locations.get(query)
+
+class GeocodeCache:
+    """Append-only JSON-lines cache of geocoding answers, so an interrupted build resumes where it stopped.
+
+    Misses are cached too, but only count as answered for `miss_ttl` seconds; after
+    that the station is looked up again.
     """
-    Geocodes railway stations using the Google Maps Geocoding API and updates lat/lon.
+
+    def __init__(self, path, miss_ttl=GEOCODE_MISS_TTL):
+        self.path = path
+        self.miss_ttl = miss_ttl
+        self._results = {}
+        self._missed_at = {}
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # a line cut short by an interrupted run
+                    self._results[entry['query']] = entry['location']
+                    if not entry['location']:
+                        # Misses recorded before timestamps were written have expired.
+                        self._missed_at[entry['query']] = entry.get('at', 0)
+
+    def __contains__(self, query):
+        if query not in self._results:
+            return False
+        if self._results[query]:
+            return True
+        return time.time() - self._missed_at.get(query, 0) < self.miss_ttl
+
+    def get(self, query):
+        location = self._results.get(query)
+        return tuple(location) if location else None
+
+    def put(self, query, location):
+        with self._lock:
+            self._results[query] = list(location) if location else None
+            entry = {'query': query, 'location': self._results[query]}
+            if not location:
+                entry['at'] = self._missed_at[query] = time.time()
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+def geocode_query(station):
+    return station['station_name'] + ", Kerala, India"
+
+def geocode_stations(stations, geocoder, cache, existing=None, workers=GEOCODE_WORKERS, rate=GEOCODE_RATE):
     """
-    gmaps = googlemaps.Client(key=google_maps_api_key)
+    Fill in lat/lon for each station, geocoding only what neither the previous output nor the cache answers.
 
+    `existing` is the previously saved station list; a station keeps its coordinates
+    from there as long as its code and name are unchanged. Remaining lookups run on
+    `workers` threads sharing a `rate` requests/second token bucket.
+    """
+    previous = {}
+    for station in existing or []:
+        if station.get('lat') is not None and station.get('lon') is not None:
+            previous[(station.get('station_code'), station.get('station_name'))] = (station['lat'], station['lon'])
+
+    pending = {}
     for station in stations:
-        try:
-            geocode_result = gmaps.geocode(station['station_name'] + ", Kerala, India")
-
-            if geocode_result:
-                location = geocode_result[0]['geometry']['location']
-                station['lat'] = location['lat']
-                station['lon'] = location['lng']
-                print(f"Geocoded {station['station_name']}: {station['lat']}, {station['lon']}")
-            else:
-                print(f"Could not geocode {station['station_name']}")
-                station['lat'] = None
-                station['lon'] = None
+        known = previous.get((station.get('station_code'), station.get('station_name')))
+        query = geocode_query(station)
+        if known is None and query in cache:
+            known = cache.get(query)
+        if known is not None or query in cache:
+            station['lat'], station['lon'] = known if known else (None, None)
+        else:
+            pending.setdefault(query, []).append(station)
+    print(f"{len(stations) - sum(len(group) for group in pending.values())} stations already located, geocoding {len(pending)} queries")
 
-        except Exception as e:
-            print(f"Error geocoding {station['station_name']}: {e}")
-            station['lat'] = None
-            station['lon'] = None
+    bucket = TokenBucket(rate)
 
-        time.sleep(0.2)  # Respect Rate Limit
+    def lookup(query):
+        bucket.acquire()
+        location = geocoder.geocode(query)
+        cache.put(query, location)
+        return location
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = {executor.submit(lookup, query): query for query in pending}
+        for future in concurrent.futures.as_completed(futures):
+            query = futures[future]
+            try:
+                location = future.result()
+            except Exception as e:
+                print(f"Error geocoding {query}: {e}")
+                location = None
+            for station in pending[query]:
+                station['lat'], station['lon'] = location if location else (None, None)
+            if location:
+                print(f"Geocoded {query}: {location[0]}, {location[1]}")
+            else:
+                print(f"Could not geocode {query}")
 
     return stations
 
+def load_stations_json(filename):
+    if not os.path.exists(filename):
+        return []
+    with open(filename, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
 def save_stations_to_json(stations, filename="kerala_railway_stations.json"):
     """Saves the railway station data to a JSON file."""
-        # Ensure the directory exists
-    os.makedirs(os.path.dirname(filename), exist_ok=True)
-    with open(filename, 'w', encoding='utf-8') as f:
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # Write to a temp file first so an interrupted save never leaves a truncated dataset.
+    tmp_path = filename + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
         json.dump(stations, f, indent=4, ensure_ascii=False)  # Save Json with pretty formatting and Unicode support
+    os.replace(tmp_path, filename)
 
 if __name__ == '__main__':
     #HTML_FILE = r'I:\Downloads\Kerala Railway Stations Tapioca.html'  # Replace with your file path
-    OUTPUT_JSON = r"H:\RGTApp\RGT\backend\kerala_railway_stations.json" # Full PAth!
+    OUTPUT_JSON = os.getenv("RGT_STATIONS_JSON_PATH", r"H:\RGTApp\RGT\backend\kerala_railway_stations.json") # Full PAth!
     GOOGLE_MAPS_API_KEY = os.getenv("GOOGLE_MAPS_API_KEY")  # Replace with your API key
     if not GOOGLE_MAPS_API_KEY:
         print("Error: GOOGLE_MAPS_API_KEY not found in environment variables. Set this with .env")
         exit()
 
     #all_stations = extract_station_data(HTML_FILE) # No Longer needed
-    geolocated_stations = geocode_stations(stations_data, GOOGLE_MAPS_API_KEY)
+    geolocated_stations = geocode_stations(
+        stations_data, GoogleGeocoder(GOOGLE_MAPS_API_KEY), GeocodeCache(GEOCODE_CACHE_PATH),
+        existing=load_stations_json(OUTPUT_JSON)
+    )
     save_stations_to_json(geolocated_stations, OUTPUT_JSON)
 
-    print(f"Geocoded, and saved {len(geolocated_stations)} stations to {OUTPUT_JSON}")
\ No newline at end of file
+    print(f"Geocoded, and saved {len(geolocated_stations)} stations to {OUTPUT_JSON}")
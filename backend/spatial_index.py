@@ -0,0 +1,64 @@
+from math import radians, sin, cos
+
+
+def to_unit_vector(lat, lon):
+    """Map a lat/lon in degrees onto the unit sphere."""
+    phi = radians(lat)
+    lam = radians(lon)
+    return (cos(phi) * cos(lam), cos(phi) * sin(lam), sin(phi))
+
+
+class SpatialIndex:
+    """KD-tree over points on the sphere for nearest-neighbour lookups.
+
+    Points are stored as 3D unit vectors. Chord length grows monotonically with
+    great-circle distance, so the nearest point by chord is the nearest point by
+    haversine. Ties resolve to the lowest index, matching `min()` over a list.
+    """
+
+    def __init__(self, coords):
+        points = [(to_unit_vector(lat, lon), i) for i, (lat, lon) in enumerate(coords)]
+        self.size = len(points)
+        self._root = self._build(points, 0)
+
+    def _build(self, points, axis):
+        if not points:
+            return None
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        next_axis = (axis + 1) % 3
+        # Node layout: (vector, index, axis, left, right)
+        return (
+            points[mid][0],
+            points[mid][1],
+            axis,
+            self._build(points[:mid], next_axis),
+            self._build(points[mid + 1:], next_axis),
+        )
+
+    def nearest(self, lat, lon):
+        """Index of the point closest to (lat, lon), or None if the index is empty."""
+        if self._root is None:
+            return None
+        target = to_unit_vector(lat, lon)
+        best = [float('inf'), None]
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            vector, index, axis, left, right = node
+            dx = vector[0] - target[0]
+            dy = vector[1] - target[1]
+            dz = vector[2] - target[2]
+            dist = dx * dx + dy * dy + dz * dz
+            if dist < best[0] or (dist == best[0] and index < best[1]):
+                best[0] = dist
+                best[1] = index
+            diff = target[axis] - vector[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            # Visit the far side only if the splitting plane is within the best radius.
+            if diff * diff <= best[0]:
+                stack.append(far)
+            stack.append(near)
+        return best[1]
@@ -0,0 +1,131 @@
+import json
+import logging
+import os
+import numpy as np
+
+
+def snapshot_path_for(json_path):
+    return os.path.splitext(json_path)[0] + ".npz"
+
+
+def compile_stations(stations):
+    """Compile the station list into flat arrays.
+
+    Routes are stored CSR-style: route r owns route_members[route_ptr[r]:route_ptr[r + 1]],
+    in dataset order, with route_prev/route_next giving each position's neighbours (-1 at the ends).
+    """
+    route_names = []
+    route_lists = {}
+    primary_route = []
+    for i, station in enumerate(stations):
+        routes = station['route'] if isinstance(station['route'], list) else [station['route']]
+        for route in routes:
+            if route not in route_lists:
+                route_lists[route] = []
+                route_names.append(route)
+            route_lists[route].append(i)
+        primary_route.append(route_names.index(routes[0]) if routes else -1)
+
+    route_ptr = [0]
+    members, prev, nxt = [], [], []
+    for route in route_names:
+        ids = route_lists[route]
+        members.extend(ids)
+        prev.extend([-1] + ids[:-1])
+        nxt.extend(ids[1:] + [-1])
+        route_ptr.append(len(members))
+
+    lat = np.array([s['lat'] for s in stations], dtype=np.float64)
+    lon = np.array([s['lon'] for s in stations], dtype=np.float64)
+    return {
+        'lat': lat,
+        'lon': lon,
+        'lat_rad': np.radians(lat),
+        'lon_rad': np.radians(lon),
+        'codes': np.array([s.get('station_code') or s.get('code') or '' for s in stations]),
+        'names': np.array([s.get('station_name') or s.get('name') or '' for s in stations]),
+        'primary_route': np.array(primary_route, dtype=np.int32),
+        'route_names': np.array(route_names),
+        'route_ptr': np.array(route_ptr, dtype=np.int32),
+        'route_members': np.array(members, dtype=np.int32),
+        'route_prev': np.array(prev, dtype=np.int32),
+        'route_next': np.array(nxt, dtype=np.int32),
+    }
+
+
+def build_snapshot(json_path, snapshot_path=None):
+    """Compile `json_path` into a .npz snapshot next to it (the build step)."""
+    snapshot_path = snapshot_path or snapshot_path_for(json_path)
+    with open(json_path, 'r', encoding='utf-8') as f:
+        arrays = compile_stations(json.load(f))
+    tmp_path = snapshot_path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, snapshot_path)
+    return snapshot_path, len(arrays['lat'])
+
+
+class StationTable:
+    """Station dataset as parallel arrays; every lookup on the request path is index arithmetic."""
+
+    def __init__(self, arrays):
+        self.lat = arrays['lat']
+        self.lon = arrays['lon']
+        self.lat_rad = arrays['lat_rad']
+        self.lon_rad = arrays['lon_rad']
+        self.codes = arrays['codes'].tolist()
+        self.names = arrays['names'].tolist()
+        self.route_names = arrays['route_names'].tolist()
+        self.primary_route = arrays['primary_route']
+        self.route_ptr = arrays['route_ptr']
+        self.route_members = arrays['route_members']
+        self.route_prev = arrays['route_prev']
+        self.route_next = arrays['route_next']
+        self.route_ids = {name: r for r, name in enumerate(self.route_names)}
+        # Response dicts are immutable per station, so build them once.
+        self._formatted = [
+            {'name': name or None, 'code': code or None, 'position': {'latitude': lat, 'longitude': lon}}
+            for name, code, lat, lon in zip(self.names, self.codes, self.lat.tolist(), self.lon.tolist())
+        ]
+
+    @classmethod
+    def load(cls, json_path):
+        """Load the compiled snapshot, or compile the JSON in memory if the snapshot is missing or stale."""
+        snapshot_path = snapshot_path_for(json_path)
+        if os.path.exists(snapshot_path) and (
+            not os.path.exists(json_path) or os.path.getmtime(snapshot_path) >= os.path.getmtime(json_path)
+        ):
+            with np.load(snapshot_path, allow_pickle=False) as data:
+                return cls({key: data[key] for key in data.files})
+        logging.warning(f"Station snapshot {snapshot_path} missing or stale; run build_station_snapshot.py")
+        with open(json_path, 'r', encoding='utf-8') as f:
+            return cls(compile_stations(json.load(f)))
+
+    def __len__(self):
+        return len(self.lat)
+
+    def route_slice(self, route):
+        r = self.route_ids.get(route)
+        if r is None:
+            return None
+        return slice(int(self.route_ptr[r]), int(self.route_ptr[r + 1]))
+
+    def route_station_ids(self, route):
+        """Station indices of `route` in sequence order."""
+        span = self.route_slice(route)
+        return self.route_members[span] if span else None
+
+    def primary_route_of(self, station_id):
+        r = self.primary_route[station_id]
+        return self.route_names[r] if r >= 0 else None
+
+    def neighbours(self, route, position):
+        """(station, previous station, next station) indices for a position within `route`; None at the ends."""
+        offset = self.route_slice(route).start + position
+        prev = int(self.route_prev[offset])
+        nxt = int(self.route_next[offset])
+        return int(self.route_members[offset]), (prev if prev >= 0 else None), (nxt if nxt >= 0 else None)
+
+    def format(self, station_id):
+        if station_id is None:
+            return None
+        return self._formatted[station_id]
@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# The scraper reads its configuration at import time; keep its log file and timetable out of the tree.
+os.chdir(tempfile.mkdtemp(prefix="rgt-tests-"))
+os.environ["RGT_TIMETABLE_PATH"] = os.path.join(os.getcwd(), "kerala_timetable.db")
@@ -0,0 +1,65 @@
+"""Offline checks that the HTTP backend reads a Live Station page the way the Selenium path does."""
+import os
+from datetime import datetime
+
+import pytest
+
+import NTES_scraper
+from ntes_http import parse_station_board
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE = os.path.join(FIXTURE_DIR, "live_station_ERS.html")
+# The same board as served without a <tbody>; browsers insert one, lxml does not.
+FIXTURE_NO_TBODY = os.path.join(FIXTURE_DIR, "live_station_ERS_no_tbody.html")
+
+# What Selenium's cell `.text` returns for the train, arrival and departure cells of the fixture's rows.
+SELENIUM_ROWS = [
+    ("16301 | VENAD EXPRESS\n(SRR-TVC)", "10:12\nSch 10:05", "10:17\nSch 10:10"),
+    ("12626 | KERALA EXPRESS (NDLS-TVC)", "10:40", "10:45\nOn Time"),
+    ("16342 | GURUVAYUR INTERCITY (GUV-TVC)", "Source", "11:55"),
+    ("06018 | ERS-KYJ MEMU (ERS-KYJ)", "09:20", "09:30"),
+    ("12081 | JAN SHATABDI (CAN-TVC)", "12:40", "12:45"),
+]
+
+
+class FrozenDatetime(datetime):
+    """10:00 on a fixed day, so the two-hour window over the fixture is deterministic."""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2024, 5, 1, 10, 0)
+
+    @classmethod
+    def today(cls):
+        return cls.now()
+
+
+@pytest.fixture(params=[FIXTURE, FIXTURE_NO_TBODY], ids=["tbody", "no_tbody"])
+def page_html(request):
+    with open(request.param, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture
+def frozen_now(monkeypatch):
+    monkeypatch.setattr(NTES_scraper, "datetime", FrozenDatetime)
+
+
+def test_rows_match_selenium_cell_text(page_html):
+    assert parse_station_board(page_html) == SELENIUM_ROWS
+
+
+def test_page_without_results_table(page_html):
+    assert parse_station_board(page_html.replace("w3-table", "w3-card")) is None
+
+
+def test_train_records_match_selenium_path(page_html, frozen_now):
+    records = NTES_scraper.build_train_records(parse_station_board(page_html), "ERS")
+    assert records == NTES_scraper.build_train_records(SELENIUM_ROWS, "ERS")
+    assert [(train["trainNumber"], train["trainName"], train["route"]["fullRoute"],
+             train["schedule"]["arrival"], train["schedule"]["departure"]) for train in records] == [
+        ("16301", "VENAD EXPRESS", "SRR-TVC", "10:12", "10:17"),
+        ("12626", "KERALA EXPRESS", "NDLS-TVC", "10:40", "10:45"),
+        ("16342", "GURUVAYUR INTERCITY", "GUV-TVC", "Unknown", "11:55"),
+    ]
+    assert all(train["metadata"]["queriedStation"] == "ERS" for train in records)
@@ -0,0 +1,182 @@
+import json
+import logging
+import sqlite3
+import threading
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_minutes(time_str):
+    """Minutes after midnight for an "HH:MM" string, or None."""
+    try:
+        hours, minutes = time_str.split(":")[:2]
+        return int(hours) * 60 + int(minutes)
+    except (AttributeError, ValueError):
+        return None
+
+
+def format_minutes(minutes):
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def signed_delta(later, earlier):
+    """Minutes from `earlier` to `later` on a 24h clock, in [-720, 720)."""
+    return (later - earlier + MINUTES_PER_DAY // 2) % MINUTES_PER_DAY - MINUTES_PER_DAY // 2
+
+
+class Timetable:
+    """Scheduled stops per train in SQLite, indexed by station and departure minute.
+
+    Rows come from an imported timetable (source 'timetable', see build_timetable.py)
+    or are learned from live boards the first time a train is seen at a station
+    (source 'observed'); observed rows never overwrite imported ones. An observed
+    row is one sighting at its expected (possibly late) time on one day, so it is
+    never served as a schedule: only imported stations count as known, and
+    overlay_live_board drops observed rows the live board doesn't confirm.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS trains (train_number TEXT PRIMARY KEY, train_name TEXT, "
+            "origin TEXT, destination TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS stops (train_number TEXT NOT NULL, station_code TEXT NOT NULL, "
+            "seq INTEGER, arr_min INTEGER, dep_min INTEGER NOT NULL, source TEXT NOT NULL, "
+            "PRIMARY KEY (train_number, station_code))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS stops_by_station_time ON stops (station_code, dep_min)")
+        self._stations = {
+            row[0] for row in conn.execute("SELECT DISTINCT station_code FROM stops WHERE source = 'timetable'")
+        }
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            self._local.conn = conn
+        return conn
+
+    def knows(self, station_code):
+        """Whether the imported timetable has any stops at `station_code`."""
+        return station_code in self._stations
+
+    def import_trains(self, trains):
+        """Load [{trainNumber, trainName, origin, destination, stops: [{station, arrival, departure}]}] records."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for train in trains:
+                conn.execute(
+                    "INSERT OR REPLACE INTO trains VALUES (?, ?, ?, ?)",
+                    (train["trainNumber"], train.get("trainName", ""), train.get("origin", ""), train.get("destination", ""))
+                )
+                for seq, stop in enumerate(train["stops"]):
+                    arr = parse_minutes(stop.get("arrival"))
+                    dep = parse_minutes(stop.get("departure"))
+                    if dep is None:
+                        dep = arr
+                    if dep is None:
+                        continue
+                    conn.execute(
+                        "INSERT OR REPLACE INTO stops VALUES (?, ?, ?, ?, ?, 'timetable')",
+                        (train["trainNumber"], stop["station"], seq, arr, dep)
+                    )
+                    self._stations.add(stop["station"])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def learn_board(self, station_code, trains):
+        """Record trains from a live board that the timetable doesn't have at this station yet."""
+        conn = self._conn()
+        conn.execute("BEGIN")
+        try:
+            for train in trains:
+                dep = parse_minutes(train["schedule"].get("departure"))
+                if dep is None:
+                    continue
+                route = train.get("route", {})
+                conn.execute(
+                    "INSERT OR IGNORE INTO trains VALUES (?, ?, ?, ?)",
+                    (train["trainNumber"], train.get("trainName", ""), route.get("origin", ""), route.get("destination", ""))
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO stops VALUES (?, ?, NULL, ?, ?, 'observed')",
+                    (train["trainNumber"], station_code, parse_minutes(train["schedule"].get("arrival")), dep)
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def board(self, station_code, now_minutes, window=120):
+        """Scheduled departures from `station_code` in the next `window` minutes, shaped like a scraped board."""
+        end = now_minutes + window
+        query = (
+            "SELECT s.train_number, t.train_name, t.origin, t.destination, s.arr_min, s.dep_min, s.source "
+            "FROM stops s JOIN trains t ON t.train_number = s.train_number "
+            "WHERE s.station_code = ? AND s.dep_min BETWEEN ? AND ?"
+        )
+        rows = self._conn().execute(query, (station_code, now_minutes, min(end, MINUTES_PER_DAY - 1))).fetchall()
+        if end >= MINUTES_PER_DAY:
+            # Window runs past midnight.
+            rows += self._conn().execute(query, (station_code, 0, end - MINUTES_PER_DAY)).fetchall()
+        board = []
+        for train_number, name, origin, destination, arr, dep, source in rows:
+            board.append({
+                "trainNumber": train_number,
+                "trainName": name,
+                "route": {"origin": origin, "destination": destination, "fullRoute": f"{origin}-{destination}"},
+                "schedule": {"arrival": format_minutes(arr) if arr is not None else "Unknown",
+                             "departure": format_minutes(dep)},
+                "metadata": {"queriedStation": station_code, "lastUpdated": None},
+                "direction": {"from": "", "to": ""},
+                "source": source,
+                "delayMinutes": None
+            })
+        board.sort(key=lambda train: (parse_minutes(train["schedule"]["departure"]) - now_minutes) % MINUTES_PER_DAY)
+        return board
+
+
+def overlay_live_board(baseline, live):
+    """Timetable baseline with live times laid over it, train by train.
+
+    Trains on both boards take the live times and report their delay against the
+    imported timetable (None against a learned row); live-only trains are added;
+    imported timetable-only trains keep their scheduled times. Without a live
+    board only the imported rows are returned.
+    """
+    if live is None:
+        return [train for train in baseline if train["source"] != "observed"]
+    live_by_number = {train["trainNumber"]: train for train in live}
+    merged = []
+    for scheduled in baseline:
+        current = live_by_number.pop(scheduled["trainNumber"], None)
+        if current is None:
+            # Learned rows are only as good as one past sighting; trust the live board over them.
+            if scheduled["source"] != "observed":
+                merged.append(scheduled)
+            continue
+        live_dep = parse_minutes(current["schedule"].get("departure"))
+        planned_dep = parse_minutes(scheduled["schedule"]["departure"])
+        delay = None
+        # A learned row is one past sighting, possibly late itself, not a schedule to measure delay against.
+        if live_dep is not None and scheduled["source"] != "observed":
+            delay = signed_delta(live_dep, planned_dep)
+        merged.append({**current, "source": "live", "delayMinutes": delay})
+    merged.extend({**train, "source": "live", "delayMinutes": None} for train in live_by_number.values())
+    return merged
+
+
+def load_timetable_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        trains = json.load(f)
+    logging.info(f"Read {len(trains)} trains from {path}")
+    return trains
@@ -46,44 +46,8 @@ export const simplifyCoordinates = (coords) => {
   return coords.filter((_, index) => index % 10 === 0);
 };
 
-export const clusterCrossings = (crossings, clusterThreshold = 0.05) => {
-  const clusters = [];
-  const used = new Set();
-  for (let i = 0; i < crossings.length; i++) {
-    if (used.has(i)) continue;
-    const cluster = [crossings[i]];
-    used.add(i);
-
-    for (let j = i + 1; j < crossings.length; j++) {
-      if (used.has(j)) continue;
-      const dist = haversine(
-        crossings[i].latitude,
-        crossings[i].longitude,
-        crossings[j].latitude,
-        crossings[j].longitude
-      );
-      if (dist < clusterThreshold) {
-        cluster.push(crossings[j]);
-        used.add(j);
-      }
-    }
-
-    const avgLat = cluster.reduce((sum, c) => sum + c.latitude, 0) / cluster.length;
-    const avgLon = cluster.reduce((sum, c) => sum + c.longitude, 0) / cluster.length;
-    clusters.push({
-      latitude: avgLat,
-      longitude: avgLon,
-      crossingCenter: { latitude: avgLat, longitude: avgLon },
-      nodeCount: cluster.length,
-    });
-  }
-
-  return clusters.map((cluster, index) => ({
-    ...cluster,
-    gateNumber: index + 1,
-    name: `Gate ${index + 1}`,
-  }));
-};
+// Backend serving /gates and /railway_data
+const BACKEND_URL = 'http://192.168.1.5:5000';
 
 // Utility to delay execution
 const delay = (ms) => new Promise(resolve => setTimeout(resolve, ms));
@@ -105,61 +69,44 @@ export const fetchGates = async (routeCoordinates, setGates, setFetchingGates) =
     { minLat: Infinity, maxLat: -Infinity, minLon: Infinity, maxLon: -Infinity }
   );
 
-  const query = `[out:json][timeout:60];
-    node["railway"="level_crossing"](${bounds.minLat - 0.01},${bounds.minLon - 0.01},${bounds.maxLat + 0.01},${bounds.maxLon + 0.01});
-    out body;`;
-
-  const endpoints = [
-    `https://overpass-api.de/api/interpreter?data=${encodeURIComponent(query)}`,
-    `https://z.overpass-api.de/api/interpreter?data=${encodeURIComponent(query)}`,
-  ];
+  // Gates are prebuilt and clustered on the backend from an offline OSM import.
+  const bbox = [bounds.minLat - 0.01, bounds.minLon - 0.01, bounds.maxLat + 0.01, bounds.maxLon + 0.01].join(',');
+  const url = `${BACKEND_URL}/gates?bbox=${bbox}`;
 
   for (let attempt = 1; attempt <= 3; attempt++) {
-    for (const url of endpoints) {
-      try {
-        console.log(`Attempt ${attempt}: Fetching gates from ${url}`);
-        const response = await fetch(url, { timeout: 60000 });
-        if (!response.ok) {
-          throw new Error(`HTTP error! status: ${response.status}`);
-        }
-
-        const data = await response.json();
-        if (!data.elements || !Array.isArray(data.elements)) {
-          throw new Error("Invalid data format from Overpass API");
-        }
-        if (data.elements.length === 0) {
-          Alert.alert("Info", "No railway crossings found in this area.");
-          setGates([]);
-          setFetchingGates(false); // Ensure state is reset
-          return;
-        }
-
-        const crossings = data.elements.map(crossing => ({
-          latitude: crossing.lat,
-          longitude: crossing.lon,
-          crossingCenter: { latitude: crossing.lat, longitude: crossing.lon },
-        }));
-
-        const simplifiedCrossings = simplifyCoordinates(crossings);
-        const clusteredCrossings = clusterCrossings(simplifiedCrossings, 0.05);
-
-        setGates(clusteredCrossings);
-        setFetchingGates(false); // Reset state on success
-        return; // Success, exit the function
-      } catch (error) {
-        console.error(`Attempt ${attempt} failed:`, error);
-        if (attempt === 3 && url === endpoints[endpoints.length - 1]) {
-          // Last attempt and last endpoint
-          Alert.alert(
-            "Error",
-            "Could not fetch railway crossings due to a server timeout. Please check your internet connection and try again."
-          );
-          setGates([]);
-          setFetchingGates(false); // Ensure state is reset
-        } else {
-          // Wait before retrying
-          await delay(2000); // 2-second delay between retries
-        }
+    try {
+      console.log(`Attempt ${attempt}: Fetching gates from ${url}`);
+      const response = await fetch(url);
+      if (!response.ok) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+      }
+
+      const data = await response.json();
+      if (!data.gates || !Array.isArray(data.gates)) {
+        throw new Error("Invalid data format from backend");
+      }
+      if (data.gates.length === 0) {
+        Alert.alert("Info", "No railway crossings found in this area.");
+        setGates([]);
+        setFetchingGates(false); // Ensure state is reset
+        return;
+      }
+
+      setGates(data.gates);
+      setFetchingGates(false); // Reset state on success
+      return; // Success, exit the function
+    } catch (error) {
+      console.error(`Attempt ${attempt} failed:`, error);
+      if (attempt === 3) {
+        Alert.alert(
+          "Error",
+          "Could not fetch railway crossings. Please check your internet connection and try again."
+        );
+        setGates([]);
+        setFetchingGates(false); // Ensure state is reset
+      } else {
+        // Wait before retrying
+        await delay(2000); // 2-second delay between retries
       }
     }
   }
@@ -174,7 +121,7 @@ export const sendDataToBackend = async ({ gates, routeCoordinates, selectedGateI
   try {
     const payload = { gates, routeCoordinates, selectedGateId };
     console.log("Sending payload to backend:", JSON.stringify(payload, null, 2));
-    const response = await fetch('http://192.168.1.5:5000/railway_data', {
+    const response = await fetch(`${BACKEND_URL}/railway_data`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json' },
       body: JSON.stringify(payload),